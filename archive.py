@@ -0,0 +1,117 @@
+import argparse
+import csv
+import gzip
+import os
+from collections import namedtuple
+from datetime import datetime, timedelta
+from sqlalchemy import delete, select
+from models import DEFAULT_DATABASE_URL, Player, Score, init_db
+
+#Score rows older than the retention window are moved out of the database into gzipped
+#CSV files, one per run, named after the dates they span:
+#   scores-<first date>-<last date>-<last id>.csv.gz   (dates as YYYYMMDD)
+#The rollups already count every archived score, so nothing the game reads changes.
+ARCHIVE_DIRECTORY = "score_archive"
+DEFAULT_RETENTION_DAYS = 90
+FIELDS = ["id", "player_id", "player_name", "score", "date"]
+FILE_DATE_FORMAT = "%Y%m%d"
+
+ArchivedScore = namedtuple("ArchivedScore", FIELDS)
+
+def archive_scores(engine, directory=ARCHIVE_DIRECTORY, retention_days=DEFAULT_RETENTION_DAYS, now=None):
+    """Move every score played more than retention_days before now into a new archive file
+    in directory and return its path, or None when there was nothing to archive.
+
+    The rows are deleted in the transaction that read them, which only commits once the
+    file is safely on disk; if anything fails the file is removed and the rows stay.
+    """
+    cutoff = (now or datetime.now()) - timedelta(days=retention_days)
+    os.makedirs(directory, exist_ok=True)
+    partial = os.path.join(directory, "scores.partial")
+    path = None
+    try:
+        with engine.begin() as connection:
+            rows = connection.execute(select(Score.id, Score.player_id, Player.name, Score.score, Score.date)
+                                      .outerjoin(Player, Score.player_id == Player.id)
+                                      .where(Score.date < cutoff)
+                                      .order_by(Score.date, Score.id))
+            first = last = None
+            last_id = 0
+            with open(partial, "wb") as raw:
+                with gzip.open(raw, "wt", newline="") as archive:
+                    writer = csv.writer(archive)
+                    writer.writerow(FIELDS)
+                    for score_id, player_id, name, score, date in rows:
+                        writer.writerow([score_id, "" if player_id is None else player_id, name or "", score, date.isoformat()])
+                        first = first or date
+                        last = date
+                        last_id = max(last_id, score_id)
+                raw.flush()
+                os.fsync(raw.fileno())
+            if first is None:
+                os.remove(partial)
+                return None
+            path = os.path.join(directory, "scores-{}-{}-{}.csv.gz".format(first.strftime(FILE_DATE_FORMAT), last.strftime(FILE_DATE_FORMAT), last_id))
+            os.replace(partial, path)
+            connection.execute(delete(Score).where(Score.date < cutoff, Score.id <= last_id))
+    except BaseException:
+        for leftover in (partial, path):
+            if leftover is not None and os.path.exists(leftover):
+                os.remove(leftover)
+        raise
+    return path
+
+class ScoreArchive(object):
+    """Reads back the scores archive_scores moved out of the database.
+
+    Files are skipped by the dates in their names, so a query over a date range only
+    decompresses the files that can hold matching scores.
+    """
+
+    def __init__(self, directory=ARCHIVE_DIRECTORY):
+        self.directory = directory
+
+    def files(self):
+        """(first day, day after the last, path) of every archive file, oldest first"""
+        if not os.path.isdir(self.directory):
+            return []
+        found = []
+        for filename in os.listdir(self.directory):
+            parts = filename[:-len(".csv.gz")].split("-")
+            if not filename.endswith(".csv.gz") or len(parts) != 4 or parts[0] != "scores":
+                continue
+            first, last = (datetime.strptime(part, FILE_DATE_FORMAT) for part in parts[1:3])
+            found.append((first, last + timedelta(days=1), os.path.join(self.directory, filename)))
+        return sorted(found)
+
+    def query(self, player_id=None, since=None, until=None):
+        """Yield the ArchivedScores of player_id (every player if None) played at or after
+        since and before until, oldest first"""
+        for first, end, path in self.files():
+            if (since is not None and end <= since) or (until is not None and first >= until):
+                continue
+            with gzip.open(path, "rt", newline="") as archive:
+                for row in csv.DictReader(archive):
+                    score = ArchivedScore(int(row["id"]), int(row["player_id"]) if row["player_id"] else None, row["player_name"],
+                                          int(row["score"]), datetime.fromisoformat(row["date"]))
+                    if player_id is not None and score.player_id != player_id:
+                        continue
+                    if (since is not None and score.date < since) or (until is not None and score.date >= until):
+                        continue
+                    yield score
+
+def main():
+    parser = argparse.ArgumentParser(description="Move old scores out of the database into compressed archive files")
+    parser.add_argument("--days", type=int, default=DEFAULT_RETENTION_DAYS, help="keep scores from this many most recent days in the database")
+    parser.add_argument("--database", default=DEFAULT_DATABASE_URL, help="SQLAlchemy URL of the database")
+    parser.add_argument("--directory", default=ARCHIVE_DIRECTORY, help="directory the archive files are written to")
+    args = parser.parse_args()
+
+    path = archive_scores(init_db(args.database), args.directory, args.days)
+    if path is None:
+        print("no scores older than {} days".format(args.days))
+    else:
+        print("archived to {}".format(path))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+import argparse
+import itertools
+import json
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+from pygame.locals import K_DOWN, K_LEFT, K_RIGHT, K_UP
+
+from starship import METEOR_COUNT, METEOR_SPEED_RANGE, SPACECRAFT_SPEED, SIMULATION_MAX_TIME
+from waves import DEFAULT_WAVES
+
+#Games are handed to the workers in chunks so that each task amortises its pickling
+CHUNK_SIZE = 200
+SCORE_PERCENTILES = (10, 50, 90, 99)
+SURVIVAL_TIMES = (5, 10, 30, 60, 120, 300)
+MANOEUVRES = ((), (K_LEFT,), (K_RIGHT,), (K_UP, K_LEFT), (K_UP, K_RIGHT), (K_DOWN,))
+RANDOM_HOLD_FRAMES = 30
+DODGE_LOOKAHEAD = 250
+DODGE_MARGIN = 40
+
+def idle_pilot(game, seed):
+    return lambda frame: ()
+
+def random_pilot(game, seed):
+    """Holds a random manoeuvre for a quarter second at a time"""
+    rng = random.Random(seed)
+    manoeuvre = [()]
+    def script(frame):
+        if frame % RANDOM_HOLD_FRAMES == 0:
+            manoeuvre[0] = rng.choice(MANOEUVRES)
+        return manoeuvre[0]
+    return script
+
+def dodge_pilot(game, seed):
+    """Steps sideways, away from the closest meteor falling towards the ship"""
+    def script(frame):
+        ship = game.starship.location
+        positions = game.meteor_field.positions
+        above = positions[:, 1] < ship.y
+        threats = above & (positions[:, 1] > ship.y - DODGE_LOOKAHEAD) & (np.abs(positions[:, 0] - ship.x) < DODGE_MARGIN)
+        if not threats.any():
+            return ()
+        nearest = np.flatnonzero(threats)[np.argmax(positions[threats, 1])]
+        go_left = positions[nearest, 0] >= ship.x
+        if go_left and ship.x < DODGE_MARGIN * 2:
+            go_left = False
+        elif not go_left and ship.x > game.meteor_field.bounds[0] - DODGE_MARGIN * 2:
+            go_left = True
+        return (K_LEFT,) if go_left else (K_RIGHT,)
+    return script
+
+PILOTS = {"idle": idle_pilot, "random": random_pilot, "dodge": dodge_pilot}
+
+def start_worker():
+    from starship import GameApp
+    #Simulated games never touch the database, so workers keep an empty one in memory
+    GameApp.initialize(headless=True, database_url="sqlite://")
+
+def run_chunk(cell, pilot_name, settings, seeds, max_time):
+    """Play one chunk of games in a worker and return (cell, [(score, sim_time, crashed), ...])"""
+    from starship import GameApp, ScriptedInput
+    game = GameApp.menu_system.get_state("game_play")
+    pilot = PILOTS[pilot_name]
+    results = []
+    for seed in seeds:
+        result = GameApp.simulate(seed, ScriptedInput(pilot(game, seed)), max_time=max_time, **settings)
+        results.append((result.score, result.sim_time, result.crashed))
+    return cell, results
+
+class CellStats(object):
+    """Score and survival distribution of every game played so far with one set of parameters"""
+
+    def __init__(self, pilot, settings, games):
+        self.pilot = pilot
+        self.settings = settings
+        self.games = games
+        self.scores = []
+        self.times = []
+        self.crashes = 0
+
+    def add(self, results):
+        for score, sim_time, crashed in results:
+            self.scores.append(score)
+            self.times.append(sim_time)
+            self.crashes += crashed
+
+    def summary(self):
+        scores = np.array(self.scores)
+        times = np.array(self.times)
+        return {
+            "pilot": self.pilot,
+            "meteor_count": self.settings["meteor_count"],
+            "meteor_speed_range": list(self.settings["meteor_speed_range"]),
+            "spacecraft_speed": self.settings["spacecraft_speed"],
+            "waves": self.settings["waves"] is not None,
+            "games": len(scores),
+            "of": self.games,
+            "crash_rate": self.crashes / len(scores),
+            "score_mean": float(scores.mean()),
+            "score_percentiles": {str(pct): float(value) for pct, value in zip(SCORE_PERCENTILES, np.percentile(scores, SCORE_PERCENTILES))},
+            "survival_mean_s": float(times.mean()),
+            "survival": {str(seconds): float(np.mean(times >= seconds)) for seconds in SURVIVAL_TIMES},
+        }
+
+def parse_list(text, convert=int):
+    return [convert(item) for item in text.split(",")]
+
+def parse_range(text):
+    low, high = text.split("-")
+    return (int(low), int(high))
+
+def sweep(pilots, meteor_counts, speed_ranges, spacecraft_speeds, games, output, workers=None, base_seed=0, max_time=SIMULATION_MAX_TIME, waves=None):
+    """Play games for every combination of the parameters, appending each cell's updated
+    summary to output (JSON lines) as chunks finish and its final summary once it is done.
+    Every cell plays the same seeds, so cells differ only by their parameters."""
+    cells = []
+    for pilot, meteor_count, speed_range, spacecraft_speed in itertools.product(pilots, meteor_counts, speed_ranges, spacecraft_speeds):
+        settings = {"meteor_count": meteor_count, "meteor_speed_range": speed_range, "spacecraft_speed": spacecraft_speed, "waves": waves}
+        cells.append(CellStats(pilot, settings, games))
+
+    start = time.perf_counter()
+    with open(output, "w") as results_file, ProcessPoolExecutor(workers, initializer=start_worker) as pool:
+        futures = []
+        for index, cell in enumerate(cells):
+            for first in range(base_seed, base_seed + games, CHUNK_SIZE):
+                seeds = range(first, min(first + CHUNK_SIZE, base_seed + games))
+                futures.append(pool.submit(run_chunk, index, cell.pilot, cell.settings, seeds, max_time))
+
+        for future in as_completed(futures):
+            index, results = future.result()
+            cell = cells[index]
+            cell.add(results)
+            row = cell.summary()
+            row["final"] = len(cell.scores) == cell.games
+            row["elapsed_s"] = time.perf_counter() - start
+            results_file.write(json.dumps(row) + "\n")
+            results_file.flush()
+    return [cell.summary() for cell in cells]
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulate games headless across a grid of difficulty settings")
+    parser.add_argument("--pilots", default="random", help="comma separated pilots: " + ", ".join(PILOTS))
+    parser.add_argument("--meteors", default=str(METEOR_COUNT), help="comma separated meteor counts")
+    parser.add_argument("--meteor-speeds", default="{}-{}".format(*METEOR_SPEED_RANGE), help="comma separated LOW-HIGH meteor speed ranges")
+    parser.add_argument("--ship-speeds", default=str(SPACECRAFT_SPEED), help="comma separated spacecraft speeds")
+    parser.add_argument("--waves", action="store_true", help="ramp the meteors up through the default waves, which override the meteor count")
+    parser.add_argument("--games", type=int, default=1000, help="games per combination of settings")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the first game of every combination")
+    parser.add_argument("--max-time", type=float, default=SIMULATION_MAX_TIME, help="simulated seconds after which a game counts as survived")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="worker processes")
+    parser.add_argument("--output", default="batch_results.jsonl", help="JSON lines file the summaries are streamed to")
+    args = parser.parse_args()
+
+    pilots = args.pilots.split(",")
+    for pilot in pilots:
+        if pilot not in PILOTS:
+            parser.error("unknown pilot {!r}".format(pilot))
+
+    start = time.perf_counter()
+    summaries = sweep(pilots, parse_list(args.meteors), parse_list(args.meteor_speeds, parse_range), parse_list(args.ship_speeds),
+                      args.games, args.output, args.workers, args.seed, args.max_time, DEFAULT_WAVES if args.waves else None)
+    for summary in summaries:
+        print("{pilot:7} meteors {meteor_count:4} speed {meteor_speed_range} ship {spacecraft_speed:4}: "
+              "crash rate {crash_rate:.3f}  score mean {score_mean:.1f}  survival mean {survival_mean_s:.1f}s".format(**summary))
+    print("{} games in {:.1f}s, results in {}".format(sum(summary["games"] for summary in summaries), time.perf_counter() - start, args.output))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""Compare the broadphases, including the ArrayScan gameplay uses, against the original
+per-object linear scan.
+
+Every entity moves each frame, so the broadphase timings include the cost of keeping
+the index up to date. Run from the repository root with: python -m benchmarks.broadphase
+"""
+import time
+import numpy as np
+import pygame
+from broadphase import ArrayScan, LinearScan, SpatialHash
+
+SCREEN_SIZE = (1366, 768)
+ENTITY_COUNTS = (10, 1000, 10000)
+BOX_SIZE = (9, 11)
+FRAMES = 50
+MAX_PAIR_SCAN = 1000
+
+def make_boxes(count, rng):
+    boxes = np.empty((count, 4))
+    boxes[:, 0] = rng.uniform(0, SCREEN_SIZE[0], count)
+    boxes[:, 1] = rng.uniform(0, SCREEN_SIZE[1], count)
+    boxes[:, 2] = boxes[:, 0] + BOX_SIZE[0]
+    boxes[:, 3] = boxes[:, 1] + BOX_SIZE[1]
+    return boxes
+
+def move(boxes, rng):
+    step = rng.uniform(6, 9, len(boxes))
+    boxes[:, 1] += step
+    boxes[:, 3] += step
+    wrapped = boxes[:, 1] >= SCREEN_SIZE[1]
+    boxes[wrapped, 1] -= SCREEN_SIZE[1]
+    boxes[wrapped, 3] -= SCREEN_SIZE[1]
+
+def time_frames(boxes, rng, frame):
+    elapsed = 0.0
+    for _ in range(FRAMES):
+        move(boxes, rng)
+        start = time.perf_counter()
+        frame()
+        elapsed += time.perf_counter() - start
+    return elapsed / FRAMES * 1000.0
+
+def bench(count, seed=0):
+    rng = np.random.default_rng(seed)
+    starship = pygame.Rect(648, 600, 49, 36)
+    results = {}
+
+    boxes = make_boxes(count, rng)
+    def original_scan():
+        #A frame without a collision has to test every meteor, which is the common case
+        hits = 0
+        for left, top, right, bottom in boxes.tolist():
+            if starship.colliderect(pygame.Rect(left, top, right - left, bottom - top)):
+                hits += 1
+    results["original query"] = time_frames(boxes, rng, original_scan)
+
+    for name, broadphase in (("linear", LinearScan()), ("spatial hash", SpatialHash()), ("array scan", ArrayScan())):
+        boxes = make_boxes(count, rng)
+        def query():
+            broadphase.update_array("meteors", boxes)
+            broadphase.query(starship)
+        results[name + " query"] = time_frames(boxes, rng, query)
+
+        if name == "linear" and count > MAX_PAIR_SCAN:
+            continue
+        def pairs():
+            broadphase.update_array("meteors", boxes)
+            broadphase.pairs()
+        results[name + " pairs"] = time_frames(boxes, rng, pairs)
+
+    return results
+
+def run():
+    return {str(count): bench(count) for count in ENTITY_COUNTS}
+
+def main():
+    for count, results in run().items():
+        print("{} entities (ms per frame)".format(count))
+        for name, elapsed in results.items():
+            print("    {:20} {:10.4f}".format(name, elapsed))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""Compare the cost and accuracy of the gameplay collision test: the old scaled hitbox
+rects alone against the rect test followed by full and coarse collision masks.
+
+Each case scatters meteors either close around the ship, so that most frames have
+candidates for the narrowphase, or over the whole screen as in play. Hits are counted
+against the full resolution masks, which are exact.
+Run from the repository root with: python -m benchmarks.collision
+"""
+import time
+import numpy as np
+from benchmarks.common import init_headless
+from image_cache import image_cache
+from meteor_field import MeteorField
+
+SCREEN_SIZE = (1366, 768)
+SHIP_CENTER = (SCREEN_SIZE[0] // 2, SCREEN_SIZE[1] - 100)
+NEAR_SPREAD = 120
+#(name, meteor count, whether the meteors are all near the ship)
+CASES = (("10 near", 10, True), ("100 on screen", 100, False), ("1000 on screen", 1000, False), ("5000 on screen", 5000, False))
+FRAMES = 2000
+MODES = (("rect only", None), ("mask", 1), ("coarse mask 2", 2), ("coarse mask 4", 4))
+
+def bench(count, near, seed=0):
+    init_headless()
+    meteor_image = image_cache.get("images/meteor.png")
+    ship_image = image_cache.get("images/space_craft.png")
+    rng = np.random.default_rng(seed)
+    frames = []
+    for _ in range(FRAMES):
+        positions = np.empty((count, 2))
+        if near:
+            positions[:, 0] = rng.uniform(SHIP_CENTER[0] - NEAR_SPREAD, SHIP_CENTER[0] + NEAR_SPREAD, count)
+            positions[:, 1] = rng.uniform(SHIP_CENTER[1] - NEAR_SPREAD, SHIP_CENTER[1] + NEAR_SPREAD, count)
+        else:
+            positions[:, 0] = rng.uniform(0, SCREEN_SIZE[0], count)
+            positions[:, 1] = rng.uniform(0, SCREEN_SIZE[1], count)
+        frames.append(positions)
+
+    results = {}
+    exact = None
+    for name, resolution in MODES:
+        if resolution is None:
+            field = MeteorField(meteor_image, count, SCREEN_SIZE)
+            ship_rect = ship_image.surface.get_rect()
+            ship_rect.size = (round(ship_image.hitbox_width), round(ship_image.hitbox_height))
+            ship_mask = None
+        else:
+            field = MeteorField(meteor_image, count, SCREEN_SIZE, mask=image_cache.mask("images/meteor.png", resolution), mask_resolution=resolution)
+            ship_rect = ship_image.surface.get_rect()
+            ship_mask = image_cache.mask("images/space_craft.png", resolution)
+        ship_rect.center = SHIP_CENTER
+
+        hits = []
+        elapsed = 0.0
+        for positions in frames:
+            field.positions[:] = positions
+            field.previous[:] = positions
+            field.update_hitboxes()
+            start = time.perf_counter()
+            hits.append(field.collides_with(ship_rect, ship_mask))
+            elapsed += time.perf_counter() - start
+        hits = np.array(hits)
+        if resolution == 1:
+            exact = hits
+        results[name] = {"us_per_test": elapsed / FRAMES * 1e6, "hits": hits}
+
+    for result in results.values():
+        hits = result.pop("hits")
+        result["hit_rate"] = float(hits.mean())
+        result["false_hits"] = int(np.count_nonzero(hits & ~exact))
+        result["missed_hits"] = int(np.count_nonzero(~hits & exact))
+    return results
+
+def run():
+    return {name: bench(count, near) for name, count, near in CASES}
+
+def main():
+    for case, results in run().items():
+        print("{} ({} frames)".format(case, FRAMES))
+        for name, result in results.items():
+            print("    {:14} {:8.2f} us  hit rate {:.3f}  false hits {:5}  missed {:5}".format(
+                name, result["us_per_test"], result["hit_rate"], result["false_hits"], result["missed_hits"]))
+
+if __name__ == "__main__":
+    main()
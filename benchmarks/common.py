@@ -0,0 +1,42 @@
+import statistics
+import time
+
+def summarize(samples):
+    """Reduce a list of per-call durations in seconds to frame statistics in milliseconds"""
+    ordered = sorted(samples)
+    mean = statistics.fmean(ordered)
+    return {
+        "samples": len(ordered),
+        "fps": (1.0 / mean) if mean else None,
+        "mean_ms": mean * 1000.0,
+        "p50_ms": percentile(ordered, 50) * 1000.0,
+        "p99_ms": percentile(ordered, 99) * 1000.0,
+        "max_ms": ordered[-1] * 1000.0,
+    }
+
+def percentile(ordered, pct):
+    index = min(len(ordered) - 1, max(0, round(pct / 100.0 * (len(ordered) - 1))))
+    return ordered[index]
+
+def sample(function, repeats, clock=time.perf_counter):
+    samples = []
+    for _ in range(repeats):
+        start = clock()
+        function()
+        samples.append(clock() - start)
+    return samples
+
+def init_headless():
+    """Start the game without a display, writing to a throwaway database.
+    Must be called from the repository root."""
+    import os
+    import tempfile
+    from models import Player
+    from starship import GameApp
+    if GameApp.screen is None:
+        GameApp.initialize(headless=True, database_url="sqlite:///" + os.path.join(tempfile.mkdtemp(), "benchmark.db"))
+        GameApp.current_player = Player(name="benchmark")
+        GameApp.session.add(GameApp.current_player)
+        GameApp.session.commit()
+        GameApp.refresh_high_scores()
+    return GameApp
@@ -0,0 +1,67 @@
+"""Latency of GameApp.refresh_high_scores, GameApp.get_player_list and a cold player
+directory page against SQLite databases seeded with increasing numbers of scores.
+
+Run from the repository root with: python -m benchmarks.database
+"""
+import os
+import random
+import tempfile
+from datetime import datetime, timedelta
+from sqlalchemy import insert
+from benchmarks.common import sample, summarize
+from models import Player, Score, make_engine, migrate, rebuild_rollups, session_factory
+from player_directory import PlayerDirectory
+
+SCORE_COUNTS = (1000, 100000, 1000000)
+PLAYER_COUNT = 5000
+BATCH_SIZE = 50000
+REPEATS = 20
+
+def seed_database(path, score_count, seed=0):
+    rng = random.Random(seed)
+    engine = make_engine("sqlite:///" + path)
+    start_date = datetime(2020, 1, 1)
+    with engine.begin() as connection:
+        migrate(connection)
+        connection.execute(insert(Player), [{"name": "player_{}".format(i)} for i in range(PLAYER_COUNT)])
+        for offset in range(0, score_count, BATCH_SIZE):
+            rows = []
+            for _ in range(min(BATCH_SIZE, score_count - offset)):
+                rows.append({"score": rng.randint(0, 500), "player_id": rng.randint(1, PLAYER_COUNT),
+                             "date": start_date + timedelta(minutes=rng.randint(0, 1000000))})
+            connection.execute(insert(Score), rows)
+        rebuild_rollups(connection)
+    return engine
+
+def bench(score_count, directory, repeats=REPEATS):
+    from starship import GameApp
+    engine = seed_database(os.path.join(directory, "scores_{}.db".format(score_count)), score_count)
+    previous_session = GameApp.session
+    GameApp.session = session_factory(bind=engine)
+    directory = PlayerDirectory(GameApp.session)
+    def directory_page():
+        directory.invalidate()
+        directory.page("player_1", "player_1")
+    try:
+        results = {
+            "refresh_high_scores": summarize(sample(GameApp.refresh_high_scores, repeats)),
+            "get_player_list": summarize(sample(GameApp.get_player_list, repeats)),
+            "player_directory_page": summarize(sample(directory_page, repeats)),
+        }
+    finally:
+        GameApp.session.close()
+        GameApp.session = previous_session
+        engine.dispose()
+    return results
+
+def run(score_counts=SCORE_COUNTS):
+    with tempfile.TemporaryDirectory() as directory:
+        return {str(count): bench(count, directory) for count in score_counts}
+
+def main():
+    for count, result in run().items():
+        for name, summary in result.items():
+            print("{:>8} scores  {:20} p50 {:.3f} ms  p99 {:.3f} ms".format(count, name, summary["p50_ms"], summary["p99_ms"]))
+
+if __name__ == "__main__":
+    main()
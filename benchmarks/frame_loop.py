@@ -0,0 +1,46 @@
+"""Frame time of GamePlayMenu.update + do_actions at different meteor counts.
+
+Run from the repository root with: python -m benchmarks.frame_loop
+"""
+from benchmarks.common import init_headless, summarize
+import time
+
+ENTITY_COUNTS = (10, 100, 1000, 5000)
+FRAMES = 300
+TIME_PASSED = 1 / 120.0
+
+def bench(count, frames=FRAMES):
+    GameApp = init_headless()
+    game = GameApp.menu_system.get_state("game_play")
+    game.reset_game(seed=0, meteor_count=count)
+    game.renderer.invalidate()
+    pixels_before = game.renderer.total_pixels_pushed
+
+    update_samples = []
+    render_samples = []
+    frame_samples = []
+    for _ in range(frames):
+        start = time.perf_counter()
+        #Collisions are ignored so every frame carries the full entity load
+        game.update(TIME_PASSED)
+        updated = time.perf_counter()
+        game.do_actions()
+        rendered = time.perf_counter()
+        update_samples.append(updated - start)
+        render_samples.append(rendered - updated)
+        frame_samples.append(rendered - start)
+
+    return {"update": summarize(update_samples), "do_actions": summarize(render_samples), "frame": summarize(frame_samples),
+            "pixels_pushed_per_frame": (game.renderer.total_pixels_pushed - pixels_before) / frames}
+
+def run():
+    return {str(count): bench(count) for count in ENTITY_COUNTS}
+
+def main():
+    for count, result in run().items():
+        frame = result["frame"]
+        print("{:>6} meteors: {:8.1f} fps  p50 {:.3f} ms  p99 {:.3f} ms  {:9.0f} px pushed".format(
+            count, frame["fps"], frame["p50_ms"], frame["p99_ms"], result["pixels_pushed_per_frame"]))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""Per-frame cost of in-game text: pygame_gui labels updated with set_text against HUD
+counters drawn from a glyph atlas, with every counter changing on every frame and with
+none of them changing.
+
+Run from the repository root with: python -m benchmarks.hud
+"""
+import pygame
+import pygame_gui
+from benchmarks.common import init_headless, sample, summarize
+
+COUNTERS = 6
+REPEATS = 300
+
+def run(repeats=REPEATS):
+    GameApp = init_headless()
+    from hud import HUD, GlyphAtlas
+    from image_cache import load_font
+    from starship import HUD_FONT_SIZE, NUMBER_FONT_FILE, SCREEN_SIZE, WHITE
+    screen = GameApp.screen
+    rects = [pygame.Rect((20 + 160 * number, 20), (150, 40)) for number in range(COUNTERS)]
+
+    manager = pygame_gui.UIManager(SCREEN_SIZE)
+    labels = [pygame_gui.elements.UILabel(relative_rect=rect, text="0", manager=manager) for rect in rects]
+    hud = HUD(GlyphAtlas(load_font(NUMBER_FONT_FILE, HUD_FONT_SIZE), WHITE))
+    for number, rect in enumerate(rects):
+        hud.add(str(number), rect, "N: ", 0)
+
+    frame = [0]
+    def label_frame():
+        frame[0] += 1
+        for label in labels:
+            label.set_text("N: " + str(frame[0]))
+        manager.update(1 / 120.0)
+        manager.draw_ui(screen)
+
+    def hud_frame():
+        frame[0] += 1
+        for name in hud.items:
+            hud.set(name, frame[0])
+        hud.erase(screen, [])
+        hud.draw(screen)
+
+    def hud_static_frame():
+        hud.erase(screen, [])
+        hud.draw(screen)
+
+    return {
+        "gui_labels": summarize(sample(label_frame, repeats)),
+        "hud_changing": summarize(sample(hud_frame, repeats)),
+        "hud_static": summarize(sample(hud_static_frame, repeats)),
+    }
+
+def main():
+    for name, result in run().items():
+        print("{:14} mean {:.4f} ms  p99 {:.4f} ms".format(name, result["mean_ms"], result["p99_ms"]))
+
+if __name__ == "__main__":
+    main()
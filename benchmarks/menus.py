@@ -0,0 +1,38 @@
+"""Cost of each menu state's do_actions, as wall time (including any frame cap the state
+applies) and as CPU time.
+
+The splash screen is left out because it only waits on the preload thread, and gameplay
+is covered by benchmarks.frame_loop.
+
+Run from the repository root with: python -m benchmarks.menus
+"""
+import time
+from benchmarks.common import init_headless, sample, summarize
+
+REPEATS = 200
+SKIPPED_STATES = ("splash_screen", "game_play")
+
+def run(repeats=REPEATS):
+    GameApp = init_headless()
+    results = {}
+    for name in sorted(GameApp.menu_system.factories):
+        if name in SKIPPED_STATES:
+            continue
+        state = GameApp.menu_system.get_state(name)
+        state.container.show()
+        state.entry_actions()
+        results[name] = {
+            "wall": summarize(sample(state.do_actions, repeats)),
+            "cpu": summarize(sample(state.do_actions, repeats, time.process_time)),
+        }
+        state.exit_actions()
+        state.container.hide()
+    return results
+
+def main():
+    for name, result in run().items():
+        wall, cpu = result["wall"], result["cpu"]
+        print("{:15} wall p50 {:.3f} ms  p99 {:.3f} ms  cpu mean {:.3f} ms".format(name, wall["p50_ms"], wall["p99_ms"], cpu["mean_ms"]))
+
+if __name__ == "__main__":
+    main()
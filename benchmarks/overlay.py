@@ -0,0 +1,54 @@
+"""Frame cost of the pause screen: the original per-frame darkening against the cached
+OverlayCompositor background.
+
+Run from the repository root with: python -m benchmarks.overlay
+"""
+import pygame
+from benchmarks.common import init_headless, sample, summarize
+
+REPEATS = 300
+
+def legacy_backfill(screen, old_screen):
+    #What GameState.do_actions(backfill=False) did on every frame before the compositor
+    screen.blit(old_screen, (0, 0))
+    darkening = pygame.Surface((1366, 768))
+    darkening.set_alpha(190)
+    darkening.fill((0, 0, 0))
+    screen.blit(darkening, (0, 0))
+
+def run(repeats=REPEATS):
+    GameApp = init_headless()
+    game = GameApp.menu_system.get_state("game_play")
+    game.reset_game(seed=0)
+    game.renderer.invalidate()
+    game.do_actions()
+    old_screen = GameApp.screen.copy()
+    GameApp.overlay.capture(GameApp.screen)
+
+    pause = GameApp.menu_system.get_state("pause_screen")
+    pause.container.show()
+    pause.entry_actions()
+
+    def legacy_frame():
+        legacy_backfill(GameApp.screen, old_screen)
+        pause.gui_manager.update(pause.time_delta)
+        pause.gui_manager.draw_ui(GameApp.screen)
+        pygame.display.update()
+
+    results = {
+        "legacy_frame": summarize(sample(legacy_frame, repeats)),
+        "compositor_frame": summarize(sample(pause.do_actions, repeats)),
+        "legacy_backfill": summarize(sample(lambda: legacy_backfill(GameApp.screen, old_screen), repeats)),
+        "compositor_backfill": summarize(sample(lambda: GameApp.overlay.draw(GameApp.screen), repeats)),
+        "compose": summarize(sample(GameApp.overlay.compose, repeats)),
+    }
+    pause.container.hide()
+    GameApp.overlay.release()
+    return results
+
+def main():
+    for name, result in run().items():
+        print("{:20} mean {:.3f} ms  p99 {:.3f} ms".format(name, result["mean_ms"], result["p99_ms"]))
+
+if __name__ == "__main__":
+    main()
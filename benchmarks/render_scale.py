@@ -0,0 +1,41 @@
+"""GamePlayMenu.do_actions at each render scale, with the game simulated the same way at all of them.
+
+Run from the repository root with: python -m benchmarks.render_scale
+"""
+from benchmarks.common import init_headless, sample, summarize
+from resolution import RENDER_SCALES
+
+ENTITY_COUNTS = (100, 1000, 5000)
+FRAMES = 300
+TIME_PASSED = 1 / 120.0
+
+def bench(scale, count, frames=FRAMES):
+    GameApp = init_headless()
+    if GameApp.resolution.scale != scale:
+        GameApp.set_render_scale(scale)
+    game = GameApp.menu_system.get_state("game_play")
+    game.reset_game(seed=0, meteor_count=count)
+    game.renderer.invalidate()
+    pixels_before = game.renderer.total_pixels_pushed
+
+    def frame():
+        #Collisions are ignored so every frame carries the full entity load
+        game.update(TIME_PASSED)
+        game.do_actions()
+    result = summarize(sample(frame, frames))
+    result["pixels_pushed_per_frame"] = (game.renderer.total_pixels_pushed - pixels_before) / frames
+    return result
+
+def run():
+    results = {str(scale): {str(count): bench(scale, count) for count in ENTITY_COUNTS} for scale in RENDER_SCALES}
+    init_headless().set_render_scale(RENDER_SCALES[0])
+    return results
+
+def main():
+    for scale, counts in run().items():
+        for count, result in counts.items():
+            print("scale {:4}  {:>5} meteors: {:8.1f} fps  p50 {:.3f} ms  p99 {:.3f} ms  {:9.0f} px pushed".format(
+                scale, count, result["fps"], result["p50_ms"], result["p99_ms"], result["pixels_pushed_per_frame"]))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""Replays as load fixtures: record games with a scripted pilot, then time playing them
+back headless (update only) and rendered (update + do_actions), checking each replay
+ends with the recorded score.
+
+Pass replay files to time those instead of freshly recorded ones.
+Run from the repository root with: python -m benchmarks.replay [FILE ...]
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+from pygame.locals import K_DOWN, K_LEFT, K_RIGHT, K_UP
+from benchmarks.common import init_headless
+from replay import ReplayPlayer
+
+SEEDS = range(5)
+MANOEUVRES = ((), (K_LEFT,), (K_RIGHT,), (K_UP, K_LEFT), (K_UP, K_RIGHT), (K_DOWN,))
+FRAMES_PER_MANOEUVRE = 30
+
+def record_fixtures(GameApp, directory):
+    from starship import ScriptedInput
+    paths = []
+    for seed in SEEDS:
+        rng = random.Random(seed)
+        manoeuvres = [rng.choice(MANOEUVRES) for _ in range(1000)]
+        script = lambda frame: manoeuvres[(frame // FRAMES_PER_MANOEUVRE) % len(manoeuvres)]
+        path = os.path.join(directory, "seed-{}.replay".format(seed))
+        GameApp.simulate(seed, ScriptedInput(script), record_path=path)
+        paths.append(path)
+    return paths
+
+def bench(GameApp, path, render):
+    recording = ReplayPlayer(path)
+    start = time.perf_counter()
+    result = GameApp.replay(path, render=render)
+    elapsed = time.perf_counter() - start
+    return {
+        "frames": result.frames,
+        "bytes": os.path.getsize(path),
+        "ms_per_frame": elapsed / result.frames * 1000.0,
+        "matches": (result.score, result.crashed) == (recording.score, recording.crashed),
+    }
+
+def run(paths=None):
+    GameApp = init_headless()
+    paths = paths or record_fixtures(GameApp, tempfile.mkdtemp())
+    return {os.path.basename(path): {"headless": bench(GameApp, path, False), "rendered": bench(GameApp, path, True)}
+            for path in paths}
+
+def main():
+    for name, result in run(sys.argv[1:]).items():
+        headless, rendered = result["headless"], result["rendered"]
+        print("{:16} {:6} frames {:6} bytes  headless {:.3f} ms/frame  rendered {:.3f} ms/frame{}".format(
+            name, headless["frames"], headless["bytes"], headless["ms_per_frame"], rendered["ms_per_frame"],
+            "" if headless["matches"] and rendered["matches"] else "  MISMATCH"))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""The queries behind the leaderboard, score ranks and player stats, answered from the
+scores table as before the rollups and from the rollup tables, at growing numbers of
+scores; then the cost of writing a score with the rollups and of archiving.
+
+Run from the repository root with: python -m benchmarks.rollups
+"""
+import os
+import shutil
+import tempfile
+from datetime import datetime
+from sqlalchemy import func
+from benchmarks.common import sample, summarize
+from benchmarks.database import seed_database
+from archive import archive_scores
+from leaderboard import Leaderboard
+from models import Player, PlayerRollup, Score, session_factory
+from persistence import ScoreWriter
+
+SCORE_COUNTS = (10000, 100000, 1000000)
+REPEATS = 20
+WRITES = 200
+RANKED_SCORE = 250
+STATS_PLAYER_ID = 1
+#seed_database spreads its scores over about two years from the start of 2020
+ARCHIVE_NOW = datetime(2022, 1, 1)
+ARCHIVE_RETENTION_DAYS = 365
+
+def scores_top(session, size=10):
+    return (session.query(Player.name, Score.score)
+            .join(Player, Score.player_id == Player.id)
+            .order_by(Score.score.desc())
+            .limit(size)
+            .all())
+
+def scores_rank(session, score=RANKED_SCORE):
+    #The old Leaderboard read every score once, sorted, and searched that
+    values = [value for value, in session.query(Score.score).order_by(Score.score)]
+    return sum(1 for value in values if value > score) + 1
+
+def recent_scores(session, player_id, recent=5):
+    return [value for value, in session.query(Score.score).filter(Score.player_id == player_id).order_by(Score.date.desc()).limit(recent)]
+
+def scores_stats(session, player_id=STATS_PLAYER_ID):
+    stats = (session.query(func.max(Score.score), func.count(Score.id), func.avg(Score.score))
+             .filter(Score.player_id == player_id)
+             .one())
+    return stats, recent_scores(session, player_id)
+
+def rollup_top(session):
+    Leaderboard(10).load(session)
+
+def rollup_rank(session):
+    leaderboard = Leaderboard(10)
+    leaderboard.load(session)
+    return leaderboard.rank(RANKED_SCORE)
+
+def rollup_stats(session, player_id=STATS_PLAYER_ID):
+    stats = session.query(PlayerRollup.best, PlayerRollup.games, PlayerRollup.total).filter(PlayerRollup.player_id == player_id).one()
+    return stats, recent_scores(session, player_id)
+
+QUERIES = (("top", scores_top, rollup_top), ("rank", scores_rank, rollup_rank), ("stats", scores_stats, rollup_stats))
+
+def bench(score_count, directory, repeats=REPEATS):
+    engine = seed_database(os.path.join(directory, "scores_{}.db".format(score_count)), score_count)
+    session = session_factory(bind=engine)
+    results = {}
+    try:
+        for name, from_scores, from_rollups in QUERIES:
+            results[name + "_scores"] = summarize(sample(lambda: from_scores(session), repeats))
+            results[name + "_rollups"] = summarize(sample(lambda: from_rollups(session), repeats))
+        session.close()
+
+        writer = ScoreWriter(lambda: session_factory(bind=engine))
+        samples = []
+        try:
+            for score in range(WRITES):
+                samples.extend(sample(lambda: writer.submit(STATS_PLAYER_ID, score).result(), 1))
+        finally:
+            writer.close()
+        results["write"] = summarize(samples)
+
+        archive_directory = os.path.join(directory, "archive")
+        results["archive"] = summarize(sample(lambda: archive_scores(engine, archive_directory, ARCHIVE_RETENTION_DAYS, ARCHIVE_NOW), 1))
+        results["archive"]["bytes"] = sum(os.path.getsize(os.path.join(archive_directory, name)) for name in os.listdir(archive_directory))
+        shutil.rmtree(archive_directory)
+    finally:
+        session.close()
+        engine.dispose()
+    return results
+
+def run(score_counts=SCORE_COUNTS):
+    with tempfile.TemporaryDirectory() as directory:
+        return {str(count): bench(count, directory) for count in score_counts}
+
+def main():
+    for count, results in run().items():
+        for name, result in results.items():
+            print("{:>8} scores  {:14} p50 {:9.3f} ms  p99 {:9.3f} ms{}".format(
+                count, name, result["p50_ms"], result["p99_ms"], "  {} bytes".format(result["bytes"]) if "bytes" in result else ""))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""Run the benchmark suite headless and write the results as JSON.
+
+Run from the repository root with: python -m benchmarks.run [--only NAME,...] [--output FILE]
+"""
+import argparse
+import json
+import platform
+import subprocess
+import time
+from datetime import datetime, timezone
+
+from benchmarks import broadphase, collision, database, frame_loop, hud, menus, overlay, render_scale, replay, rollups, storage, stress, vector2_alloc, vector2_ops
+
+SUITES = {
+    "frame_loop": frame_loop.run,
+    "menus": menus.run,
+    "hud": hud.run,
+    "overlay": overlay.run,
+    "render_scale": render_scale.run,
+    "vector2_ops": vector2_ops.run,
+    "vector2_alloc": vector2_alloc.run,
+    "broadphase": broadphase.run,
+    "collision": collision.run,
+    "database": database.run,
+    "storage": storage.run,
+    "rollups": rollups.run,
+    "replay": replay.run,
+    "stress": stress.run,
+}
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--only", help="comma separated list of suites to run: " + ", ".join(SUITES))
+    parser.add_argument("--output", default="benchmark_results.json", help="JSON file to write the results to")
+    args = parser.parse_args()
+
+    names = args.only.split(",") if args.only else list(SUITES)
+    report = {
+        "commit": git_revision(),
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "suites": {},
+    }
+    for name in names:
+        print("running {}...".format(name))
+        start = time.perf_counter()
+        report["suites"][name] = SUITES[name]()
+        print("    done in {:.1f}s".format(time.perf_counter() - start))
+
+    with open(args.output, "w") as output:
+        json.dump(report, output, indent=2)
+    print("results written to {}".format(args.output))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""Score write latency and startup time of the storage layer against SQLite's defaults.
+
+Writes go through a ScoreWriter, one score per transaction as at the end of a game, on
+an engine with SQLite's default rollback journal and full sync and on one made by
+models.make_engine (WAL, synchronous=NORMAL). Startup is timed in a fresh process
+against a large game_data.db, both for the schema setup import used to run every time
+and for init_db, which only reads the schema version once migrations have been applied.
+
+Run from the repository root with: python -m benchmarks.storage
+"""
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from sqlalchemy import create_engine, insert
+from benchmarks.common import summarize
+from benchmarks.database import seed_database
+from models import Player, make_engine, migrate, session_factory
+from persistence import ScoreWriter
+
+WRITES = 200
+STARTUP_SCORE_COUNT = 500000
+STARTUP_REPEATS = 5
+
+#What importing models did on every start before the schema was versioned
+LEGACY_STARTUP = """
+from sqlalchemy import create_engine, inspect
+from sqlalchemy.schema import CreateIndex
+from models import Base
+engine = create_engine(URL)
+Base.metadata.create_all(engine)
+inspect(engine).get_indexes("scores")
+with engine.begin() as connection:
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            connection.execute(CreateIndex(index, if_not_exists=True))
+"""
+MIGRATED_STARTUP = """
+from models import init_db
+engine = init_db(URL)
+"""
+#Timed after either setup: the first query the menus need
+FIRST_QUERY = """
+from models import session_factory
+from leaderboard import Leaderboard
+Leaderboard(10).load(session_factory(bind=engine))
+"""
+TIMED_PROCESS = """
+import time
+start = time.perf_counter()
+URL = {url!r}
+{setup}
+setup_done = time.perf_counter()
+{query}
+print(setup_done - start, time.perf_counter() - setup_done)
+"""
+
+def write_latency(engine):
+    with engine.begin() as connection:
+        migrate(connection)
+        connection.execute(insert(Player), [{"name": "writer"}])
+    writer = ScoreWriter(lambda: session_factory(bind=engine))
+    samples = []
+    try:
+        for score in range(WRITES):
+            start = time.perf_counter()
+            writer.submit(1, score).result()
+            samples.append(time.perf_counter() - start)
+    finally:
+        writer.close()
+        engine.dispose()
+    return summarize(samples)
+
+def timed_startup(url, setup):
+    code = TIMED_PROCESS.format(url=url, setup=setup, query=FIRST_QUERY)
+    output = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True).stdout
+    setup_time, query_time = (float(value) for value in output.split())
+    return setup_time, query_time
+
+def startup(url, setup):
+    runs = [timed_startup(url, setup) for _ in range(STARTUP_REPEATS)]
+    return {"setup": summarize([run[0] for run in runs]), "first_query": summarize([run[1] for run in runs])}
+
+def run():
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        results["write_default"] = write_latency(create_engine("sqlite:///" + os.path.join(directory, "default.db")))
+        results["write_tuned"] = write_latency(make_engine("sqlite:///" + os.path.join(directory, "tuned.db")))
+
+        path = os.path.join(directory, "large.db")
+        seed_database(path, STARTUP_SCORE_COUNT).dispose()
+        url = "sqlite:///" + path
+        results["startup_legacy"] = startup(url, LEGACY_STARTUP)
+        results["startup_migrated"] = startup(url, MIGRATED_STARTUP)
+    return results
+
+def main():
+    results = run()
+    for name in ("write_default", "write_tuned"):
+        result = results[name]
+        print("{:16} p50 {:7.3f} ms  p99 {:7.3f} ms  per score".format(name, result["p50_ms"], result["p99_ms"]))
+    for name in ("startup_legacy", "startup_migrated"):
+        result = results[name]
+        print("{:16} setup p50 {:7.3f} ms  first query p50 {:7.3f} ms  ({} scores)".format(
+            name, result["setup"]["p50_ms"], result["first_query"]["p50_ms"], STARTUP_SCORE_COUNT))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+"""Stress mode: ramp the meteor field from ten meteors to thousands with the stress
+waves and report how stable the frame time stays at each load level.
+
+Frames are bucketed by the number of live meteors. A spike is a frame that takes more
+than twice its bucket's median. Collisions are ignored so the ramp always completes.
+
+Run from the repository root with: python -m benchmarks.stress
+"""
+import statistics
+import time
+from benchmarks.common import init_headless, summarize
+from waves import STRESS_WAVES
+
+TIME_PASSED = 1 / 120.0
+BUCKET_SIZE = 500
+SPIKE_RATIO = 2.0
+
+def run(waves=STRESS_WAVES):
+    GameApp = init_headless()
+    game = GameApp.menu_system.get_state("game_play")
+    game.reset_game(seed=0, waves=waves)
+    game.renderer.invalidate()
+
+    buckets = {}
+    frames = round(sum(wave.duration for wave in waves) / TIME_PASSED)
+    for _ in range(frames):
+        start = time.perf_counter()
+        game.update(TIME_PASSED)
+        game.do_actions()
+        elapsed = time.perf_counter() - start
+        buckets.setdefault(len(game.meteor_field) // BUCKET_SIZE, []).append(elapsed)
+
+    results = {}
+    for bucket, samples in sorted(buckets.items()):
+        median = statistics.median(samples)
+        result = summarize(samples)
+        result["stdev_ms"] = statistics.pstdev(samples) * 1000.0
+        result["spikes"] = sum(1 for sample in samples if sample > SPIKE_RATIO * median)
+        results["{}-{}".format(bucket * BUCKET_SIZE, (bucket + 1) * BUCKET_SIZE - 1)] = result
+    return results
+
+def main():
+    for meteors, result in run().items():
+        print("{:>10} meteors: {:5} frames  mean {:6.2f} ms  p99 {:6.2f} ms  max {:6.2f} ms  stdev {:5.2f} ms  spikes {}".format(
+            meteors, result["samples"], result["mean_ms"], result["p99_ms"], result["max_ms"], result["stdev_ms"], result["spikes"]))
+
+if __name__ == "__main__":
+    main()
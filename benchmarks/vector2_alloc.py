@@ -0,0 +1,62 @@
+"""Count Vector2 allocations and time per frame for the GameAsset movement update.
+
+Run from the repository root with: python -m benchmarks.vector2_alloc
+"""
+import time
+from vector2 import Vector2
+
+ENTITIES = 1000
+FRAMES = 200
+TIME_PASSED = 1 / 120.0
+
+def expression_update(location, heading, speed):
+    #The update GameAsset used before add_scaled existed
+    heading.normalize()
+    location += heading * speed * TIME_PASSED
+
+def fused_update(location, heading, speed):
+    heading.normalize()
+    location.add_scaled(heading, speed * TIME_PASSED)
+
+def measure(update):
+    assets = [(Vector2(i, 0.0), Vector2(0.0, 1.0), 900.0) for i in range(ENTITIES)]
+
+    original_init = Vector2.__init__
+    allocations = [0]
+    def counting_init(self, *args):
+        allocations[0] += 1
+        original_init(self, *args)
+
+    Vector2.__init__ = counting_init
+    try:
+        for location, heading, speed in assets:
+            update(location, heading, speed)
+    finally:
+        Vector2.__init__ = original_init
+
+    start = time.perf_counter()
+    for _ in range(FRAMES):
+        for location, heading, speed in assets:
+            update(location, heading, speed)
+    elapsed = (time.perf_counter() - start) / FRAMES
+
+    return allocations[0], elapsed * 1000.0
+
+UPDATES = {"expression": expression_update, "add_scaled": fused_update}
+
+def run():
+    results = {}
+    for name, update in UPDATES.items():
+        allocations, elapsed = measure(update)
+        results[name] = {"allocations_per_frame": allocations, "ms_per_frame": elapsed}
+    return results
+
+def main():
+    print("{} entities per frame".format(ENTITIES))
+    print("    {:12} {:>12} {:>10}".format("update", "allocations", "ms"))
+    for name, result in run().items():
+        allocations, elapsed = result["allocations_per_frame"], result["ms_per_frame"]
+        print("    {:12} {:>12} {:>10.4f}".format(name, allocations, elapsed))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,35 @@
+"""Vector2 arithmetic throughput in operations per second.
+
+Run from the repository root with: python -m benchmarks.vector2_ops
+"""
+import timeit
+from vector2 import Vector2
+
+NUMBER = 200000
+SETUP = "a = Vector2(3.0, 4.0); b = Vector2(0.6, 0.8)"
+
+OPERATIONS = {
+    "add": "a + b",
+    "iadd": "a += b",
+    "mul": "a * 0.5",
+    "add_scaled": "a.add_scaled(b, 0.001)",
+    "normalize": "b.normalize()",
+    "get_normalized": "a.get_normalized()",
+    "dot": "a.dot(b)",
+    "magnitude": "a.magnitude()",
+    "get_distance_to": "a.get_distance_to(b)",
+}
+
+def run(number=NUMBER):
+    results = {}
+    for name, statement in OPERATIONS.items():
+        elapsed = min(timeit.repeat(statement, setup=SETUP, globals={"Vector2": Vector2}, number=number, repeat=3))
+        results[name] = {"ops_per_sec": number / elapsed}
+    return results
+
+def main():
+    for name, result in run().items():
+        print("{:16} {:14,.0f} ops/s".format(name, result["ops_per_sec"]))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,247 @@
+from abc import ABCMeta, abstractmethod
+from bisect import bisect_right
+from collections import defaultdict
+import numpy as np
+
+#Gameplay uses ArrayScan. With the ship as the only thing tested against the meteors,
+#one vectorised pass over their hitboxes beats keeping a spatial index of meteors that
+#all move every frame (see benchmarks.broadphase).
+
+def as_box(rect):
+    """Convert a pygame.Rect or a (left, top, right, bottom) sequence to a box tuple"""
+    if hasattr(rect, "right"):
+        return (rect.left, rect.top, rect.right, rect.bottom)
+    return tuple(rect)
+
+def boxes_overlap(a, b):
+    return a[0] < b[2] and b[0] < a[2] and a[1] < b[3] and b[1] < a[3]
+
+class Broadphase(metaclass=ABCMeta):
+    """Common interface for the collision broadphases.
+
+    Entities are either registered one at a time under any hashable key with update(),
+    or as a whole group backed by an (n, 4) array of (left, top, right, bottom) boxes
+    with update_array(); array entries are keyed by (group, row index).
+    """
+
+    def __init__(self):
+        self.boxes = {}
+        self.arrays = {}
+
+    def update(self, key, rect):
+        self.boxes[key] = as_box(rect)
+
+    def update_array(self, group, boxes):
+        self.arrays[group] = boxes
+
+    def remove(self, key):
+        self.boxes.pop(key, None)
+
+    def remove_array(self, group):
+        self.arrays.pop(group, None)
+
+    def clear(self):
+        self.boxes.clear()
+        self.arrays.clear()
+
+    def get_box(self, key):
+        box = self.boxes.get(key)
+        if box is None:
+            group, index = key
+            box = self.arrays[group][index].tolist()
+        return box
+
+    @abstractmethod
+    def query(self, rect):
+        """Keys of every entity whose box overlaps rect"""
+
+    @abstractmethod
+    def pairs(self):
+        """(key, key) for every two entities whose boxes overlap"""
+
+class LinearScan(Broadphase):
+    """Tests every registered entity, the same way GamePlayMenu did before the broadphase existed"""
+
+    def entries(self):
+        for key, box in self.boxes.items():
+            yield key, box
+        for group, boxes in self.arrays.items():
+            for index, box in enumerate(boxes.tolist()):
+                yield (group, index), box
+
+    def query(self, rect):
+        box = as_box(rect)
+        return [key for key, other in self.entries() if boxes_overlap(box, other)]
+
+    def pairs(self):
+        entries = list(self.entries())
+        found = []
+        for i, (key_a, box_a) in enumerate(entries):
+            for key_b, box_b in entries[i+1:]:
+                if boxes_overlap(box_a, box_b):
+                    found.append((key_a, key_b))
+        return found
+
+class ArrayScan(Broadphase):
+    """Tests every entity, with one numpy pass per array group.
+
+    Nothing is indexed, so update_array only keeps the array and entities that all move
+    every frame cost nothing to keep up to date. pairs() sorts the boxes by left edge and
+    only tests each against the boxes that start before it ends.
+    """
+
+    def query(self, rect):
+        box = as_box(rect)
+        found = [key for key, other in self.boxes.items() if boxes_overlap(box, other)]
+        for group, boxes in self.arrays.items():
+            overlap = (boxes[:, 0] < box[2]) & (boxes[:, 2] > box[0])
+            overlap &= (boxes[:, 1] < box[3]) & (boxes[:, 3] > box[1])
+            found.extend((group, index) for index in np.flatnonzero(overlap).tolist())
+        return found
+
+    def pairs(self):
+        keys = list(self.boxes)
+        groups = list(self.arrays)
+        #Row where each group starts in boxes, after the entities registered one at a time
+        starts = [len(keys)]
+        for group in groups[:-1]:
+            starts.append(starts[-1] + len(self.arrays[group]))
+        boxes = np.concatenate([np.array(list(self.boxes.values()), dtype=np.float64).reshape(-1, 4)] +
+                               [self.arrays[group] for group in groups])
+
+        order = np.argsort(boxes[:, 0], kind="stable")
+        boxes = boxes[order]
+        #Box i is paired with the boxes after it up to the first that starts where it ends
+        first = np.arange(1, len(boxes) + 1)
+        counts = np.maximum(np.searchsorted(boxes[:, 0], boxes[:, 2]) - first, 0)
+        a = np.repeat(first - 1, counts)
+        b = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts - first, counts)
+        box_a, box_b = boxes[a], boxes[b]
+        overlap = (box_a[:, 0] < box_b[:, 2]) & (box_b[:, 0] < box_a[:, 2])
+        overlap &= (box_a[:, 1] < box_b[:, 3]) & (box_b[:, 1] < box_a[:, 3])
+
+        def key_of(row):
+            if row < len(keys):
+                return keys[row]
+            group = bisect_right(starts, row) - 1
+            return (groups[group], row - starts[group])
+        return [(key_of(row_a), key_of(row_b)) for row_a, row_b in zip(order[a[overlap]].tolist(), order[b[overlap]].tolist())]
+
+class SpatialHash(Broadphase):
+    """Loose uniform grid that files each entity under the cell holding its top-left corner.
+
+    Only entities whose cell changed since the last update are re-bucketed. Queries widen
+    their cell span up and to the left by the largest entity seen so far, so entities that
+    straddle cell borders are still found.
+    """
+
+    def __init__(self, cell_size=32):
+        super().__init__()
+        self.cell_size = cell_size
+        self.cells = defaultdict(set)
+        self.key_cells = {}
+        self.array_cells = {}
+        self.max_w = 0
+        self.max_h = 0
+
+    def cell_of(self, box):
+        return (int(box[0] // self.cell_size), int(box[1] // self.cell_size))
+
+    def move(self, key, old_cell, new_cell):
+        cells = self.cells
+        if old_cell is not None:
+            bucket = cells[old_cell]
+            bucket.discard(key)
+            if not bucket:
+                del cells[old_cell]
+        cells[new_cell].add(key)
+
+    def update(self, key, rect):
+        box = as_box(rect)
+        self.boxes[key] = box
+        self.max_w = max(self.max_w, box[2] - box[0])
+        self.max_h = max(self.max_h, box[3] - box[1])
+        cell = self.cell_of(box)
+        old_cell = self.key_cells.get(key)
+        if cell != old_cell:
+            self.move(key, old_cell, cell)
+            self.key_cells[key] = cell
+
+    def update_array(self, group, boxes):
+        if len(boxes):
+            self.max_w = max(self.max_w, float((boxes[:, 2] - boxes[:, 0]).max()))
+            self.max_h = max(self.max_h, float((boxes[:, 3] - boxes[:, 1]).max()))
+
+        cells = np.floor_divide(boxes[:, :2], self.cell_size).astype(np.int64)
+        old_cells = self.array_cells.get(group)
+        if old_cells is None or old_cells.shape != cells.shape:
+            self.remove_array(group)
+            for index, cell in enumerate(cells.tolist()):
+                self.cells[tuple(cell)].add((group, index))
+        else:
+            changed = np.flatnonzero((cells != old_cells).any(axis=1))
+            move = self.move
+            for index, old_cell, cell in zip(changed.tolist(), old_cells[changed].tolist(), cells[changed].tolist()):
+                move((group, index), tuple(old_cell), tuple(cell))
+
+        self.arrays[group] = boxes
+        self.array_cells[group] = cells
+
+    def remove(self, key):
+        cell = self.key_cells.pop(key, None)
+        if cell is not None:
+            bucket = self.cells[cell]
+            bucket.discard(key)
+            if not bucket:
+                del self.cells[cell]
+        super().remove(key)
+
+    def remove_array(self, group):
+        cells = self.array_cells.pop(group, None)
+        if cells is not None:
+            for index, cell in enumerate(cells.tolist()):
+                cell = tuple(cell)
+                bucket = self.cells[cell]
+                bucket.discard((group, index))
+                if not bucket:
+                    del self.cells[cell]
+        super().remove_array(group)
+
+    def clear(self):
+        self.cells.clear()
+        self.key_cells.clear()
+        self.array_cells.clear()
+        self.max_w = 0
+        self.max_h = 0
+        super().clear()
+
+    def candidates(self, box):
+        size = self.cell_size
+        cells = self.cells
+        found = []
+        for cx in range(int((box[0] - self.max_w) // size), int(box[2] // size) + 1):
+            for cy in range(int((box[1] - self.max_h) // size), int(box[3] // size) + 1):
+                bucket = cells.get((cx, cy))
+                if bucket:
+                    found.extend(bucket)
+        return found
+
+    def query(self, rect):
+        box = as_box(rect)
+        get_box = self.get_box
+        return [key for key in self.candidates(box) if boxes_overlap(box, get_box(key))]
+
+    def pairs(self):
+        boxes = dict(self.boxes)
+        for group, array in self.arrays.items():
+            for index, box in enumerate(array.tolist()):
+                boxes[(group, index)] = box
+
+        found = []
+        done = set()
+        for key_a, box_a in boxes.items():
+            done.add(key_a)
+            for key_b in self.candidates(box_a):
+                if key_b not in done and boxes_overlap(box_a, boxes[key_b]):
+                    found.append((key_a, key_b))
+        return found
@@ -0,0 +1,123 @@
+DIGITS = "0123456789-"
+
+class GlyphAtlas(object):
+    """Rendered text for one font and colour, kept for reuse.
+
+    Digits are rendered once each and numbers are assembled from them, so a changing
+    counter never goes back to the font. Other strings (labels, names) are rendered
+    whole the first time they are drawn.
+    """
+
+    def __init__(self, font, color, preload=()):
+        self.font = font
+        self.color = color
+        self.glyphs = {}
+        for text in DIGITS:
+            self.get(text)
+        for text in preload:
+            self.get(text)
+
+    def get(self, text):
+        glyph = self.glyphs.get(text)
+        if glyph is None:
+            glyph = self.glyphs[text] = self.font.render(text, True, self.color)
+        return glyph
+
+    def pieces(self, value):
+        """The glyphs that spell out value, which is a number or a string"""
+        if isinstance(value, int):
+            return [self.glyphs[digit] for digit in str(value)]
+        return [self.get(value)]
+
+    def blit(self, surface, pieces, position):
+        x, y = position
+        for glyph in pieces:
+            surface.blit(glyph, (x, y))
+            x += glyph.get_width()
+
+class HudItem(object):
+    __slots__ = ("rect", "label", "value", "changed", "stale", "pieces", "position")
+
+    def __init__(self, rect, label, value):
+        self.rect = rect
+        self.label = label
+        self.value = value
+        self.changed = True
+        self.stale = True
+        self.pieces = None
+        self.position = None
+
+class HUD(object):
+    """Text drawn over the game, each item a label and a value centred in a fixed rect.
+
+    An item's text stays on the surface from frame to frame. erase() clears only the
+    items that have to be drawn again, because their value changed or something under
+    them was erased, and draw() redraws those and returns their rects to be pushed.
+    """
+
+    def __init__(self, atlas):
+        self.atlas = atlas
+        self.items = {}
+
+    def add(self, name, rect, label="", value=""):
+        self.items[name] = HudItem(rect, label, value)
+        if label:
+            self.atlas.get(label)
+
+    def set(self, name, value):
+        item = self.items[name]
+        if item.value != value:
+            item.value = value
+            item.changed = True
+            item.pieces = None
+
+    def erase(self, surface, erased_rects, background=(0, 0, 0)):
+        """Clear the items to redraw this frame: those whose value changed and those overlapping
+        erased_rects, which is None when the whole surface was just repainted"""
+        for item in self.items.values():
+            if erased_rects is None:
+                item.stale = True
+            elif item.stale or item.changed or item.rect.collidelist(erased_rects) != -1:
+                #Glyphs are blended onto what is under them, so text is only drawn on a cleared rect
+                surface.fill(background, item.rect)
+                item.stale = True
+
+    def layout(self, item):
+        if item.pieces is None:
+            pieces = self.atlas.pieces(item.value)
+            if item.label:
+                pieces.insert(0, self.atlas.get(item.label))
+            width = sum(glyph.get_width() for glyph in pieces)
+            height = max(glyph.get_height() for glyph in pieces)
+            item.pieces = pieces
+            item.position = (item.rect.centerx - width // 2, item.rect.centery - height // 2)
+        return item.pieces, item.position
+
+    def draw(self, surface, drawn_rects=()):
+        """Draw the items erase() cleared and return their rects.
+
+        Text is drawn over everything else, so where drawn_rects (this frame's sprites)
+        cover an item that was left alone, that part of it is drawn again. Where a sprite
+        is transparent this blends the text onto itself once; the sprite is erased next
+        frame, so the item is then cleared and drawn afresh.
+        """
+        redrawn = []
+        clip = surface.get_clip()
+        for item in self.items.values():
+            if item.stale:
+                areas = [item.rect]
+            else:
+                areas = [item.rect.clip(drawn_rects[index]) for index in item.rect.collidelistall(drawn_rects)]
+                if not areas:
+                    continue
+            pieces, position = self.layout(item)
+            for area in areas:
+                #Text is clipped to its rect, which is all that gets cleared for it
+                surface.set_clip(area)
+                self.atlas.blit(surface, pieces, position)
+            if item.stale:
+                redrawn.append(item.rect)
+            item.changed = False
+            item.stale = False
+        surface.set_clip(clip)
+        return redrawn
@@ -0,0 +1,122 @@
+import functools
+from collections import OrderedDict, namedtuple
+import numpy as np
+import pygame
+
+HITBOX_SCALE = (0.70, 0.40)
+DEFAULT_BYTE_BUDGET = 64 * 1024 * 1024
+#Pixels with more alpha than this are solid in collision masks, as in pygame.mask.from_surface
+MASK_THRESHOLD = 127
+
+CachedImage = namedtuple("CachedImage", ["surface", "width", "height", "hitbox_width", "hitbox_height", "nbytes"])
+
+class SurfaceCache(object):
+    """Process-wide LRU cache of converted surfaces keyed by path and transform.
+
+    Each image is read from disk and converted once; transformed variants are derived
+    from the cached original. Entries are evicted least recently used first once the
+    cached pixel data exceeds the byte budget.
+    """
+
+    def __init__(self, byte_budget=DEFAULT_BYTE_BUDGET):
+        self.byte_budget = byte_budget
+        self.entries = OrderedDict()
+        #Collision masks, keyed by their image's key and resolution and dropped along with it
+        self.masks = {}
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.loads = 0
+        self.evictions = 0
+
+    def get(self, path, scale=None, rotation=0, alpha=None):
+        """Return the CachedImage for path, optionally scaled to a (w, h) size or by a factor,
+        rotated by a number of degrees and given a surface alpha"""
+        key = (str(path), scale, rotation, alpha)
+        entry = self.entries.get(key)
+        if entry is not None:
+            self.hits += 1
+            self.entries.move_to_end(key)
+            return entry
+
+        self.misses += 1
+        if scale is None and not rotation and alpha is None:
+            self.loads += 1
+            surface = pygame.image.load(path).convert_alpha()
+        else:
+            surface = self.transform(self.get(path).surface, scale, rotation, alpha)
+
+        entry = self.make_entry(surface)
+        self.entries[key] = entry
+        self.nbytes += entry.nbytes
+        self.evict()
+        return entry
+
+    def mask(self, path, resolution=1, scale=None, rotation=0, alpha=None):
+        """Return the collision mask of an image, built on first use. At a resolution above 1
+        each bit covers a resolution x resolution block and is set if any pixel in it is solid."""
+        key = ((str(path), scale, rotation, alpha), resolution)
+        mask = self.masks.get(key)
+        if mask is None:
+            surface = self.get(path, scale, rotation, alpha).surface
+            if resolution == 1:
+                mask = pygame.mask.from_surface(surface, MASK_THRESHOLD)
+            else:
+                mask = coarse_mask(surface, resolution)
+            self.masks[key] = mask
+        return mask
+
+    def transform(self, surface, scale, rotation, alpha):
+        if scale is not None:
+            if isinstance(scale, (int, float)):
+                w, h = surface.get_size()
+                scale = (round(w * scale), round(h * scale))
+            surface = pygame.transform.smoothscale(surface, scale)
+        if rotation:
+            surface = pygame.transform.rotate(surface, rotation)
+        if alpha is not None:
+            surface = surface.copy()
+            surface.set_alpha(alpha)
+        return surface
+
+    def make_entry(self, surface):
+        w, h = surface.get_size()
+        nbytes = w * h * surface.get_bytesize()
+        return CachedImage(surface, w, h, w * HITBOX_SCALE[0], h * HITBOX_SCALE[1], nbytes)
+
+    def evict(self):
+        while self.nbytes > self.byte_budget and len(self.entries) > 1:
+            key, entry = self.entries.popitem(last=False)
+            self.nbytes -= entry.nbytes
+            for mask_key in [mask_key for mask_key in self.masks if mask_key[0] == key]:
+                del self.masks[mask_key]
+            self.evictions += 1
+
+    def clear(self):
+        """Drop every entry, e.g. after the display mode (and so the pixel format) changes"""
+        self.entries.clear()
+        self.masks.clear()
+        self.nbytes = 0
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "loads": self.loads, "evictions": self.evictions,
+                "entries": len(self.entries), "bytes": self.nbytes}
+
+def coarse_mask(surface, resolution):
+    solid = pygame.surfarray.array_alpha(surface) > MASK_THRESHOLD
+    w, h = solid.shape
+    coarse_w, coarse_h = -(-w // resolution), -(-h // resolution)
+    blocks = np.zeros((coarse_w * resolution, coarse_h * resolution), dtype=bool)
+    blocks[:w, :h] = solid
+    blocks = blocks.reshape(coarse_w, resolution, coarse_h, resolution).any(axis=(1, 3))
+    mask = pygame.mask.Mask((coarse_w, coarse_h))
+    for x, y in zip(*np.nonzero(blocks)):
+        mask.set_at((int(x), int(y)))
+    return mask
+
+image_cache = SurfaceCache()
+
+@functools.lru_cache(maxsize=None)
+def load_font(path, size):
+    """Open each font file at each size once per process"""
+    return pygame.font.Font(path, size)
@@ -0,0 +1,61 @@
+from bisect import bisect_right, insort
+from itertools import accumulate
+from models import Player, ScoreCount, TopScore
+
+class Leaderboard(object):
+    """In-memory top-N high score table kept up to date as games finish.
+
+    The table is filled from top_scores, which never holds more than TOP_SCORES_KEPT
+    rows, and then updated in place by add(). rank() reads score_counts once, through
+    its primary key, into the sorted distinct scores and how many games beat each, and
+    then binary-searches those along with the scores added since. Neither grows with
+    the number of scores recorded.
+    """
+
+    def __init__(self, size=10):
+        self.size = size
+        self.top = []
+        self.score_values = None
+        self.games_above = None
+        self.added = []
+        self.session = None
+
+    def load(self, session):
+        self.session = session
+        rows = (session.query(Player.name, TopScore.score)
+                .join(Player, TopScore.player_id == Player.id)
+                .order_by(TopScore.score.desc(), TopScore.id)
+                .limit(self.size)
+                .all())
+        self.top[:] = [(name, score) for name, score in rows]
+        self.score_values = None
+        self.added = []
+
+    def lowest(self):
+        return self.top[-1][1] if self.top else 0
+
+    def is_high_score(self, score):
+        return score > 0 and (len(self.top) < self.size or score > self.lowest())
+
+    def add(self, name, score):
+        if len(self.top) < self.size or score > self.lowest():
+            position = len(self.top)
+            while position > 0 and self.top[position - 1][1] < score:
+                position -= 1
+            self.top.insert(position, (name, score))
+            del self.top[self.size:]
+
+        if self.score_values is not None:
+            insort(self.added, score)
+
+    def rank(self, score):
+        """1-based position the score would take among every game played, including games
+        of players deleted since (see models.ScoreCount)"""
+        if self.score_values is None:
+            rows = self.session.query(ScoreCount.score, ScoreCount.games).order_by(ScoreCount.score).all()
+            self.score_values = [value for value, _ in rows]
+            #games_above[i] is how many games ended on score_values[i] or higher
+            self.games_above = list(accumulate((games for _, games in reversed(rows)), initial=0))[::-1]
+            self.added = []
+        above = self.games_above[bisect_right(self.score_values, score)]
+        return 1 + above + len(self.added) - bisect_right(self.added, score)
@@ -0,0 +1,192 @@
+import math
+from itertools import repeat
+import numpy as np
+import pygame
+
+class MeteorField(object):
+    """Struct-of-arrays store that moves, respawns and hit-tests every meteor in one batched step.
+
+    The arrays are allocated for capacity meteors up front. Unused slots hold NaN
+    positions, which never render or collide. Changing target spawns meteors into free
+    slots, or despawns them as they leave the screen, without allocating anything.
+    Positions before the last update are kept too, for swept collisions and for drawing
+    the meteors part way through an update.
+    """
+
+    def __init__(self, image, count, bounds, speed_range=(800, 1000), rng=None, capacity=None, mask=None, mask_resolution=1):
+        #image is a CachedImage, which carries the sprite's size and hitbox dimensions
+        self.image = image.surface
+        self.image_w, self.image_h = image.width, image.height
+        self.set_render_scale(1.0, image)
+        self.mask_resolution = mask_resolution
+        if mask is None:
+            self.mask = None
+            self.hitbox_w = image.hitbox_width
+            self.hitbox_h = image.hitbox_height
+        else:
+            #With a mask the rect test only has to find candidates, so it covers the whole sprite
+            self.hitbox_w, self.hitbox_h = image.width, image.height
+            if mask_resolution > 1:
+                #Offsets between coarse masks are floored to whole blocks, which can shift the ship by
+                #up to a block against the meteor. Growing each meteor block over its neighbours up
+                #and to the left (and the mask one block down and right) means that never loses a hit.
+                mask = mask.convolve(pygame.mask.Mask((2, 2), fill=True))
+            self.mask = mask
+        self.bounds = bounds
+        self.speed_range = speed_range
+        self.rng = rng if rng is not None else np.random.default_rng()
+        self.capacity = max(count, capacity or 0)
+        self.target = count
+        self.active_count = 0
+        #Scales every meteor's speed, so waves can speed up meteors already on screen
+        self.speed_scale = 1.0
+
+        self.positions = np.empty((self.capacity, 2), dtype=np.float64)
+        self.previous = np.empty((self.capacity, 2), dtype=np.float64)
+        self.speeds = np.empty(self.capacity, dtype=np.float64)
+        #Hitboxes are stored as (left, top, right, bottom) and cover the meteor from its
+        #previous location to its current one
+        self.hitboxes = np.empty((self.capacity, 4), dtype=np.float64)
+        self.reset()
+
+    def __len__(self):
+        return self.active_count
+
+    def reset(self, y_location=-20.0):
+        count = self.target
+        self.positions[:] = np.nan
+        self.speeds[:] = 0.0
+        self.positions[:count, 0] = self.random_x(count)
+        self.positions[:count, 1] = y_location
+        self.speeds[:count] = self.random_speeds(count)
+        self.previous[:] = self.positions
+        self.active_count = count
+        self.update_hitboxes()
+
+    def set_target(self, count):
+        """Grow towards count meteors by spawning, or shrink by despawning meteors as they leave the screen"""
+        self.target = min(count, self.capacity)
+
+    def spawn(self, count, y_location=-20.0):
+        slots = np.flatnonzero(np.isnan(self.positions[:, 1]))[:count]
+        self.positions[slots, 0] = self.random_x(len(slots))
+        self.positions[slots, 1] = y_location
+        self.speeds[slots] = self.random_speeds(len(slots))
+        self.previous[slots] = self.positions[slots]
+        self.active_count += len(slots)
+
+    def despawn(self, slots):
+        self.positions[slots] = np.nan
+        self.previous[slots] = np.nan
+        self.speeds[slots] = 0.0
+        self.active_count -= len(slots)
+
+    def random_speeds(self, count):
+        return self.rng.integers(self.speed_range[0], self.speed_range[1], count, endpoint=True)
+
+    def random_x(self, count):
+        return self.rng.integers(0, self.bounds[0], count, endpoint=True)
+
+    def update(self, time_passed):
+        """Advance every meteor and return the number that left the bottom of the screen"""
+        self.previous[:] = self.positions
+        self.positions[:, 1] += self.speeds * (time_passed * self.speed_scale)
+
+        respawned = self.positions[:, 1] >= self.bounds[1]
+        count = int(np.count_nonzero(respawned))
+        if count:
+            excess = self.active_count - self.target
+            if excess > 0:
+                leaving = np.flatnonzero(respawned)[:excess]
+                self.despawn(leaving)
+                respawned[leaving] = False
+            recycled = count - min(max(excess, 0), count)
+            if recycled:
+                self.positions[respawned, 0] = self.random_x(recycled)
+                self.positions[respawned, 1] = 0.0
+                #Recycled meteors start afresh rather than sweeping back up the screen
+                self.previous[respawned] = self.positions[respawned]
+
+        if self.active_count < self.target:
+            self.spawn(self.target - self.active_count)
+
+        self.update_hitboxes()
+        return count
+
+    def update_hitboxes(self):
+        half_w = self.hitbox_w / 2
+        half_h = self.hitbox_h / 2
+        hitboxes = self.hitboxes
+        np.minimum(self.previous, self.positions, out=hitboxes[:, :2])
+        np.maximum(self.previous, self.positions, out=hitboxes[:, 2:])
+        hitboxes[:, 0] -= half_w
+        hitboxes[:, 1] -= half_h
+        hitboxes[:, 2] += half_w
+        hitboxes[:, 3] += half_h
+
+    def collides_with(self, rect, mask=None, previous=None, candidates=None):
+        """Return True if any meteor hitbox met the given pygame.Rect during the last update.
+
+        previous is where rect was before the update. The rect test is a swept one, between
+        the boxes covering each mover's path, so nothing can pass through the ship between
+        updates. If the field has a mask and one is given for rect's sprite, drawn with its
+        top-left at rect.topleft and at the same resolution, meteors whose boxes overlap are
+        then tested pixel by pixel at every step along the way.
+
+        candidates, if given, are the indices of the meteors whose hitboxes overlap the
+        swept rect, as a broadphase holding self.hitboxes found them.
+        """
+        if candidates is None:
+            swept = rect.union(previous) if previous is not None else rect
+            hitboxes = self.hitboxes
+            overlap = (hitboxes[:, 0] < swept.right) & (hitboxes[:, 2] > swept.left)
+            overlap &= (hitboxes[:, 1] < swept.bottom) & (hitboxes[:, 3] > swept.top)
+            candidates = np.flatnonzero(overlap)
+        if mask is None or self.mask is None:
+            return len(candidates) > 0
+
+        if not len(candidates):
+            return False
+        half_size = (self.image_w / 2, self.image_h / 2)
+        starts = (self.previous[candidates] - half_size).tolist()
+        ends = (self.positions[candidates] - half_size).tolist()
+        start = previous.topleft if previous is not None else rect.topleft
+        for meteor_start, meteor_end in zip(starts, ends):
+            if self.sweep_overlaps(mask, start, rect.topleft, meteor_start, meteor_end):
+                return True
+        return False
+
+    def sweep_overlaps(self, mask, start, end, meteor_start, meteor_end):
+        #The ship moves relative to the meteor in a straight line, which is tested at
+        #intervals of at most one mask bit, ending where both are now
+        resolution = self.mask_resolution
+        padding = 1 if resolution > 1 else 0
+        dx, dy = end[0] - start[0], end[1] - start[1]
+        meteor_dx, meteor_dy = meteor_end[0] - meteor_start[0], meteor_end[1] - meteor_start[1]
+        steps = math.ceil(max(abs(dx - meteor_dx), abs(dy - meteor_dy)) / resolution)
+        for step in range(steps, -1, -1):
+            t = step / steps if steps else 1.0
+            #Sprites are blitted at their top-left truncated to whole pixels
+            offset_x = int(start[0] + dx * t) - int(meteor_start[0] + meteor_dx * t)
+            offset_y = int(start[1] + dy * t) - int(meteor_start[1] + meteor_dy * t)
+            if self.mask.overlap(mask, (offset_x // resolution + padding, offset_y // resolution + padding)):
+                return True
+        return False
+
+    def set_render_scale(self, scale, image):
+        """Draw the field scale times its size, with image (a CachedImage) scaled to match"""
+        self.render_scale = scale
+        self.render_image = image.surface
+        self.render_w, self.render_h = image.width, image.height
+
+    def render(self, surface, alpha=1.0):
+        """Blit every visible meteor, alpha of the way from its previous location to its current
+        one, and return the list of rects drawn"""
+        positions = self.positions if alpha == 1.0 else self.previous + (self.positions - self.previous) * alpha
+        if self.render_scale != 1.0:
+            positions = positions * self.render_scale
+        visible = positions[:, 1] > -self.render_h / 2
+        top_lefts = positions[visible] - (self.render_w / 2, self.render_h / 2)
+        #The blit list is built lazily, so thousands of short-lived tuples never pile up
+        #at once and trigger (and survive into) garbage collections
+        return surface.blits(zip(repeat(self.render_image), zip(top_lefts[:, 0].tolist(), top_lefts[:, 1].tolist())))
@@ -1,38 +1,205 @@
-from sqlalchemy import create_engine, ForeignKey, DateTime, Integer, String, Column
-from sqlalchemy.orm import relationship, backref, sessionmaker
+from sqlalchemy import create_engine, event, ForeignKey, Date, DateTime, Integer, String, Column, Index, func, delete, insert, select, update
+from sqlalchemy.engine import make_url
+from sqlalchemy.schema import CreateIndex
+from sqlalchemy.orm import relationship, backref, sessionmaker, scoped_session
 from sqlalchemy.ext.declarative import declarative_base
+import itertools
+from collections import namedtuple
 from datetime import datetime
 
-engine = create_engine('sqlite:///game_data.db')
+DEFAULT_DATABASE_URL = 'sqlite:///game_data.db'
+#WAL lets the menus read while the score writer commits. With WAL, synchronous=NORMAL
+#only syncs at checkpoints: a commit survives the game crashing but can be lost on power loss.
+SQLITE_PRAGMAS = ("journal_mode=WAL", "synchronous=NORMAL", "cache_size=-16000", "temp_store=MEMORY")
+
+#top_scores keeps this many of the best scores, enough for the leaderboard to survive players being deleted
+TOP_SCORES_KEPT = 100
+
+engine = None
+#Names the shared in-memory database of each engine opened on 'sqlite://'
+memory_databases = itertools.count(1)
 Base = declarative_base()
 
+PlayerStats = namedtuple("PlayerStats", ["best", "count", "average", "recent"])
+
 class Player(Base):
     __tablename__ = 'players'
     id = Column(Integer, primary_key=True)
     name = Column(String(50), unique=True, nullable=False)
-    personal_best = Column(Integer, default=0)          #This should be automatically the highest score associated with this player
+    personal_best = Column(Integer, default=0)          #Raised in the same transaction as every score write (see persistence.ScoreWriter)
+
+    #Ordered, case-insensitive prefix search and keyset paging for the player directory
+    __table_args__ = (Index('ix_players_name_lower', func.lower(name), name),)
 
-    scores = relationship('Score', backref='player', order_by='Score.score', cascade="save-update, merge, expunge, delete, delete-orphan, refresh-expire")
+    #Dynamic, so touching a player never loads its score history; query it instead. Passive
+    #deletes, so deleting one doesn't either: delete_player removes the scores in one statement
+    scores = relationship('Score', backref='player', lazy='dynamic', order_by='Score.score.desc()', cascade="save-update, merge, expunge, delete, delete-orphan, refresh-expire", passive_deletes=True)
+    stats = relationship('PlayerRollup', uselist=False, cascade="all, delete-orphan")
+    top_scores = relationship('TopScore', cascade="all, delete-orphan")
 
     def __repr__(self):
-        return "<Player: (id={}, name={}, personal_best={})>".format(self.id, self.name, ('0' if not self.scores else self.scores[0]))
+        return "<Player: (id={}, name={}, personal_best={})>".format(self.id, self.name, self.personal_best or 0)
 
     def get_personal_best(self):
-        return (0 if not self.scores else self.scores[0].score)
-        #return self.personal_best
+        return self.personal_best or 0
+
+    def get_stats(self, recent=5):
+        """Best, number and average of this player's scores, archived ones included, plus the most recent ones"""
+        stats = self.stats
+        recent_scores = [score for score, in self.scores.with_entities(Score.score).order_by(None).order_by(Score.date.desc()).limit(recent)]
+        if stats is None:
+            return PlayerStats(0, 0, 0.0, recent_scores)
+        return PlayerStats(stats.best, stats.games, stats.total / stats.games, recent_scores)
 
 class Score(Base):
     __tablename__ = 'scores'
     id = Column(Integer, primary_key=True)
-    score = Column(Integer(), nullable=False)
+    score = Column(Integer(), nullable=False, index=True)
     date = Column(DateTime(), default=datetime.now)
     player_id = Column(Integer, ForeignKey('players.id'))
 
     #player = relationship('Player', backref=backref('scores', order_by=score))
     #player = relationship('Player', back_populates='scores')
 
+    #Serves per-player lookups as well as MAX(score) for one player straight from the index
+    __table_args__ = (Index('ix_scores_player_id_score', 'player_id', 'score'),)
+
     def __repr__(self):
         return "<Score: (id={}, player:{}, played on: {})>".format(self.id, self.player, self.date)
 
-Base.metadata.create_all(engine)
-Session = sessionmaker(bind=engine)
+#Rollups summarise every score ever written, including those since archived out of the
+#scores table. rollups.record_scores updates them in the transaction that adds the scores.
+#Deleting a player deletes its player_rollups and top_scores rows, but daily_rollups and
+#score_counts are all-time totals that keep counting its games: archived scores can no
+#longer be subtracted, and a day's best cannot be recomputed without them.
+
+class PlayerRollup(Base):
+    __tablename__ = 'player_rollups'
+    player_id = Column(Integer, ForeignKey('players.id'), primary_key=True)
+    games = Column(Integer, nullable=False)
+    total = Column(Integer, nullable=False)
+    best = Column(Integer, nullable=False)
+    last_played = Column(DateTime())
+
+class DailyRollup(Base):
+    #All-time: includes the games of players deleted since
+    __tablename__ = 'daily_rollups'
+    day = Column(Date(), primary_key=True)
+    games = Column(Integer, nullable=False)
+    total = Column(Integer, nullable=False)
+    best = Column(Integer, nullable=False)
+
+class ScoreCount(Base):
+    #How many games ended on each score, which ranks a score without reading the scores.
+    #All-time: includes the games of players deleted since
+    __tablename__ = 'score_counts'
+    score = Column(Integer, primary_key=True)
+    games = Column(Integer, nullable=False)
+
+class TopScore(Base):
+    #The best TOP_SCORES_KEPT scores, copied out of scores so that archiving never touches the leaderboard
+    __tablename__ = 'top_scores'
+    id = Column(Integer, primary_key=True)
+    player_id = Column(Integer, ForeignKey('players.id'), nullable=False)
+    score = Column(Integer, nullable=False)
+    date = Column(DateTime())
+
+    __table_args__ = (Index('ix_top_scores_score', 'score'),)
+
+def delete_player(session, player):
+    """Delete player with its scores, stats and top scores in the session's transaction"""
+    session.execute(delete(Score).where(Score.player_id == player.id))
+    session.delete(player)
+
+def sync_personal_bests(connection):
+    """Recompute every player's personal_best from the scores table"""
+    best = select(func.coalesce(func.max(Score.score), 0)).where(Score.player_id == Player.id).scalar_subquery()
+    connection.execute(update(Player).values(personal_best=best))
+
+def create_tables(connection):
+    Base.metadata.create_all(connection)
+
+def add_indexes(connection):
+    #create_all skips tables that already exist, so databases made before these indexes lack them
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            connection.execute(CreateIndex(index, if_not_exists=True))
+    #Databases from before personal_best was kept transactionally may hold stale values
+    sync_personal_bests(connection)
+
+ROLLUP_TABLES = (PlayerRollup.__table__, DailyRollup.__table__, ScoreCount.__table__, TopScore.__table__)
+
+def rebuild_rollups(connection):
+    """Recompute every rollup from the scores table. Only exact while no scores have been archived."""
+    for table in ROLLUP_TABLES:
+        connection.execute(table.delete())
+    connection.execute(insert(PlayerRollup).from_select(
+        ["player_id", "games", "total", "best", "last_played"],
+        select(Score.player_id, func.count(), func.sum(Score.score), func.max(Score.score), func.max(Score.date))
+        .where(Score.player_id.is_not(None)).group_by(Score.player_id)))
+    day = func.date(Score.date)
+    connection.execute(insert(DailyRollup).from_select(
+        ["day", "games", "total", "best"],
+        select(day, func.count(), func.sum(Score.score), func.max(Score.score)).where(Score.date.is_not(None)).group_by(day)))
+    connection.execute(insert(ScoreCount).from_select(["score", "games"], select(Score.score, func.count()).group_by(Score.score)))
+    connection.execute(insert(TopScore).from_select(
+        ["player_id", "score", "date"],
+        select(Score.player_id, Score.score, Score.date).where(Score.player_id.is_not(None))
+        .order_by(Score.score.desc(), Score.id).limit(TOP_SCORES_KEPT)))
+
+def add_rollups(connection):
+    Base.metadata.create_all(connection, tables=ROLLUP_TABLES)
+    rebuild_rollups(connection)
+
+#Schema migrations in order. The database's user_version is the number already applied,
+#so append new ones and never edit or reorder old ones.
+MIGRATIONS = (create_tables, add_indexes, add_rollups)
+
+def migrate(connection):
+    version = connection.exec_driver_sql("PRAGMA user_version").scalar()
+    for number, migration in enumerate(MIGRATIONS[version:], version + 1):
+        migration(connection)
+        connection.exec_driver_sql("PRAGMA user_version = {}".format(number))
+
+def set_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    for pragma in SQLITE_PRAGMAS:
+        cursor.execute("PRAGMA " + pragma)
+    cursor.close()
+
+def make_engine(url):
+    if make_url(url).database in (None, "", ":memory:"):
+        #Every connection to :memory: gets its own empty database. A named memdb one lets
+        #each thread keep its own connection, and so its own transactions, on the same data
+        #with SQLite's usual locking and busy waits. It lives while a pooled connection is open.
+        url = "sqlite:///file:/starship-{}?vfs=memdb&uri=true".format(next(memory_databases))
+    sqlite_engine = create_engine(url)
+    event.listen(sqlite_engine, "connect", set_sqlite_pragmas)
+    return sqlite_engine
+
+def init_db(url=DEFAULT_DATABASE_URL):
+    """Open the database at url (a SQLAlchemy URL; 'sqlite://' is in memory), bring its schema
+    up to date and bind Session to it. Anything already open is closed first."""
+    global engine
+    if engine is not None:
+        Session.remove()
+        engine.dispose()
+    engine = make_engine(url)
+    with engine.begin() as connection:
+        migrate(connection)
+    return engine
+
+def get_engine():
+    """The database engine, opening the default database on first use"""
+    if engine is None:
+        init_db()
+    return engine
+
+session_factory = sessionmaker()
+
+def create_session():
+    return session_factory(bind=get_engine())
+
+#One session per thread: the game loop's lives as long as the game, the score writer's
+#is closed after every batch
+Session = scoped_session(create_session)
@@ -0,0 +1,98 @@
+import queue
+import threading
+from concurrent.futures import Future
+from datetime import datetime
+from sqlalchemy import func, update
+from models import Player, Score, Session
+from rollups import record_scores
+
+STOP = object()
+
+class ScoreWriter(object):
+    """Writes finished games' scores on a background thread.
+
+    Submitted scores wait in a bounded queue (submit blocks when it is full) and
+    everything queued at the time of a write is committed in one transaction, which
+    also raises each player's personal_best and updates the rollups. submit() returns a Future that resolves
+    to the new Score id once the transaction is committed.
+    """
+
+    def __init__(self, session_factory=Session, max_pending=256, max_batch=64):
+        self.session_factory = session_factory
+        self.max_batch = max_batch
+        self.queue = queue.Queue(maxsize=max_pending)
+        self.closed = False
+        self.thread = threading.Thread(target=self.run, name="score-writer", daemon=True)
+        self.thread.start()
+
+    def submit(self, player_id, score, date=None, callback=None):
+        if self.closed:
+            raise RuntimeError("ScoreWriter is closed")
+        future = Future()
+        if callback is not None:
+            future.add_done_callback(callback)
+        self.queue.put((player_id, score, date or datetime.now(), future))
+        return future
+
+    def run(self):
+        stopping = False
+        while not stopping:
+            item = self.queue.get()
+            if item is STOP:
+                self.queue.task_done()
+                break
+
+            batch = [item]
+            while len(batch) < self.max_batch:
+                try:
+                    item = self.queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is STOP:
+                    stopping = True
+                    self.queue.task_done()
+                    break
+                batch.append(item)
+
+            self.write(batch)
+            for _ in batch:
+                self.queue.task_done()
+
+    def write(self, batch):
+        session = self.session_factory()
+        try:
+            scores = [Score(player_id=player_id, score=score, date=date) for player_id, score, date, _ in batch]
+            session.add_all(scores)
+            session.flush()
+            score_ids = [score.id for score in scores]
+
+            best_scores = {}
+            for player_id, score, _, _ in batch:
+                best_scores[player_id] = max(score, best_scores.get(player_id, score))
+            for player_id, best in best_scores.items():
+                session.execute(update(Player)
+                                .where(Player.id == player_id, func.coalesce(Player.personal_best, 0) < best)
+                                .values(personal_best=best))
+            record_scores(session, [(player_id, score, date) for player_id, score, date, _ in batch])
+            session.commit()
+        except Exception as error:
+            session.rollback()
+            for _, _, _, future in batch:
+                future.set_exception(error)
+        else:
+            for score_id, (_, _, _, future) in zip(score_ids, batch):
+                future.set_result(score_id)
+        finally:
+            session.close()
+
+    def flush(self):
+        """Block until every score submitted so far has been written"""
+        self.queue.join()
+
+    def close(self):
+        """Write everything still queued and stop the worker thread"""
+        if self.closed:
+            return
+        self.closed = True
+        self.queue.put(STOP)
+        self.thread.join()
@@ -0,0 +1,47 @@
+from collections import OrderedDict
+from sqlalchemy import func, tuple_
+from models import Player
+
+#Sorts after every other character, so prefix + PREFIX_END bounds all names starting with prefix
+PREFIX_END = "\U0010ffff"
+
+class PlayerDirectory(object):
+    """Pages through players in case-insensitive name order.
+
+    Pages are fetched with keyset pagination (name greater than the last name on the
+    previous page) and prefix filtering, both answered from the lower(name) index, so
+    the cost of a page does not depend on how many players exist. Recently used pages
+    are cached until invalidate() is called after a player is created or deleted.
+    """
+
+    def __init__(self, session, page_size=50, cached_pages=32):
+        self.session = session
+        self.page_size = page_size
+        self.cached_pages = cached_pages
+        self.pages = OrderedDict()
+
+    def page(self, prefix="", after=None):
+        """Return up to page_size (name, personal_best) tuples for players whose name starts
+        with prefix (ignoring case), beginning after the player named after"""
+        key = (prefix, after)
+        page = self.pages.get(key)
+        if page is not None:
+            self.pages.move_to_end(key)
+            return page
+
+        sort_key = func.lower(Player.name)
+        query = self.session.query(Player.name, Player.personal_best)
+        if prefix:
+            lower_prefix = func.lower(prefix)
+            query = query.filter(sort_key >= lower_prefix, sort_key < lower_prefix.concat(PREFIX_END))
+        if after is not None:
+            query = query.filter(tuple_(sort_key, Player.name) > tuple_(func.lower(after), after))
+        page = query.order_by(sort_key, Player.name).limit(self.page_size).all()
+
+        self.pages[key] = page
+        if len(self.pages) > self.cached_pages:
+            self.pages.popitem(last=False)
+        return page
+
+    def invalidate(self):
+        self.pages.clear()
@@ -0,0 +1,165 @@
+import csv
+import json
+import time
+from collections import deque
+import pygame
+
+OVERLAY_KEY = pygame.K_F3
+HISTOGRAM_EDGES_MS = (1, 2, 4, 8, 16, 33, 66, 133)
+STAT_FIELDS = ["count", "mean_ms", "p50_ms", "p99_ms", "max_ms"]
+
+class NullPhase(object):
+    """Context manager handed out while profiling is disabled, so instrumented code costs a method call"""
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+NULL_PHASE = NullPhase()
+
+class PhaseTimer(object):
+    __slots__ = ("profiler", "key", "start")
+
+    def __init__(self, profiler, key):
+        self.profiler = profiler
+        self.key = key
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.profiler.record(self.key, time.perf_counter() - self.start)
+        return False
+
+class FrameProfiler(object):
+    """Times named phases of each menu state over a rolling window of recent frames.
+
+    While enabled it can draw an overlay of the active state's timings (toggled with F3)
+    and periodically append summary rows to a .csv or .jsonl file.
+    """
+
+    def __init__(self, window=600, dump_interval=5.0):
+        self.enabled = False
+        self.window = window
+        self.samples = {}
+        self.gauges = {}
+        self.dump_interval = dump_interval
+        self.dump_file = None
+        self.dump_writer = None
+        self.last_dump = 0.0
+        self.overlay_visible = False
+        self.overlay_font = None
+        self.overlay_rect = None
+        self.toggle_held = False
+
+    def enable(self, dump_path=None):
+        self.enabled = True
+        if dump_path:
+            self.dump_file = open(dump_path, "w", newline="")
+            if str(dump_path).endswith(".csv"):
+                self.dump_writer = csv.DictWriter(self.dump_file, ["time", "state", "phase"] + STAT_FIELDS)
+                self.dump_writer.writeheader()
+            self.last_dump = time.perf_counter()
+
+    def disable(self):
+        if self.dump_file is not None:
+            self.dump()
+            self.dump_file.close()
+            self.dump_file = None
+            self.dump_writer = None
+        self.enabled = False
+
+    def phase(self, state, name):
+        if not self.enabled:
+            return NULL_PHASE
+        return PhaseTimer(self, (state, name))
+
+    def record(self, key, duration):
+        samples = self.samples.get(key)
+        if samples is None:
+            samples = self.samples[key] = deque(maxlen=self.window)
+        samples.append(duration)
+
+    def stats(self, key):
+        ordered = sorted(self.samples.get(key, ()))
+        if not ordered:
+            return None
+        count = len(ordered)
+        return {
+            "count": count,
+            "mean_ms": sum(ordered) / count * 1000.0,
+            "p50_ms": ordered[(count - 1) // 2] * 1000.0,
+            "p99_ms": ordered[min(count - 1, round(0.99 * (count - 1)))] * 1000.0,
+            "max_ms": ordered[-1] * 1000.0,
+        }
+
+    def histogram(self, key):
+        """Counts of recent samples falling under each of HISTOGRAM_EDGES_MS, plus one overflow bucket"""
+        counts = [0] * (len(HISTOGRAM_EDGES_MS) + 1)
+        for duration in self.samples.get(key, ()):
+            duration_ms = duration * 1000.0
+            bucket = 0
+            while bucket < len(HISTOGRAM_EDGES_MS) and duration_ms >= HISTOGRAM_EDGES_MS[bucket]:
+                bucket += 1
+            counts[bucket] += 1
+        return counts
+
+    def end_frame(self, surface, state_name):
+        pressed = pygame.key.get_pressed()[OVERLAY_KEY]
+        if pressed and not self.toggle_held:
+            self.overlay_visible = not self.overlay_visible
+            if not self.overlay_visible:
+                self.clear_overlay(surface)
+        self.toggle_held = pressed
+
+        if self.overlay_visible:
+            self.draw_overlay(surface, state_name)
+
+        if self.dump_file is not None and time.perf_counter() - self.last_dump >= self.dump_interval:
+            self.dump()
+
+    def dump(self):
+        now = time.time()
+        for (state, phase), _ in sorted(self.samples.items()):
+            row = {"time": now, "state": state, "phase": phase}
+            row.update(self.stats((state, phase)))
+            if self.dump_writer is not None:
+                self.dump_writer.writerow(row)
+            else:
+                row["histogram"] = self.histogram((state, phase))
+                self.dump_file.write(json.dumps(row) + "\n")
+        if self.dump_writer is None and self.gauges:
+            self.dump_file.write(json.dumps({"time": now, "gauges": self.gauges}) + "\n")
+        self.dump_file.flush()
+        self.last_dump = time.perf_counter()
+
+    def draw_overlay(self, surface, state_name):
+        if self.overlay_font is None:
+            self.overlay_font = pygame.font.Font(None, 20)
+
+        lines = ["{:18} {:>7} {:>7}".format(state_name, "p50", "p99")]
+        for (state, phase), _ in sorted(self.samples.items()):
+            if state == state_name:
+                stats = self.stats((state, phase))
+                lines.append("{:18} {:7.2f} {:7.2f}".format(phase, stats["p50_ms"], stats["p99_ms"]))
+        for name, value in sorted(self.gauges.items()):
+            lines.append("{:18} {:7.1f}".format(name, value))
+
+        line_height = self.overlay_font.get_linesize()
+        width = max(self.overlay_font.size(line)[0] for line in lines)
+        rect = pygame.Rect(surface.get_width() - width - 10, 10, width, line_height * len(lines))
+        update_rect = rect.union(self.overlay_rect) if self.overlay_rect else rect
+        surface.fill((0, 0, 0), update_rect)
+        for number, line in enumerate(lines):
+            surface.blit(self.overlay_font.render(line, True, (255, 255, 255), (0, 0, 0)), (rect.x, rect.y + number * line_height))
+
+        pygame.display.update(update_rect)
+        self.overlay_rect = rect
+
+    def clear_overlay(self, surface):
+        if self.overlay_rect is not None:
+            surface.fill((0, 0, 0), self.overlay_rect)
+            pygame.display.update(self.overlay_rect)
+            self.overlay_rect = None
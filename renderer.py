@@ -0,0 +1,121 @@
+import pygame
+
+#Once the changed area passes this share of the screen, one full fill and flip is cheaper
+FULL_REDRAW_RATIO = 0.5
+
+class DirtyRectRenderer(object):
+    """Redraws only the parts of the screen that changed since the last frame.
+
+    Each frame erase() paints the background over everything drawn on the previous
+    frame, the caller draws through blit()/add_drawn(), and present() pushes the
+    erased and newly drawn rects to the display in one display.update call.
+    """
+
+    def __init__(self, background=(0, 0, 0)):
+        self.background = background
+        self.drawn_rects = []
+        self.dirty_rects = []
+        #What the last erase() painted over, or None when it repainted the whole surface
+        self.erased_rects = None
+        self.full_redraw = True
+        self.full_frame = True
+        self.pixels_pushed = 0
+        self.total_pixels_pushed = 0
+        self.frames = 0
+
+    def invalidate(self):
+        """Repaint and push the whole screen on the next frame, e.g. after another state drew on it"""
+        self.full_redraw = True
+
+    def erase(self, surface):
+        self.full_frame = self.full_redraw
+        if not self.full_frame:
+            changed_area = sum(rect.width * rect.height for rect in self.drawn_rects)
+            self.full_frame = changed_area > FULL_REDRAW_RATIO * surface.get_width() * surface.get_height()
+
+        if self.full_frame:
+            surface.fill(self.background)
+            self.erased_rects = None
+        else:
+            for rect in self.drawn_rects:
+                surface.fill(self.background, rect)
+            self.dirty_rects.extend(self.drawn_rects)
+            self.erased_rects = self.drawn_rects
+        self.drawn_rects = []
+
+    def blit(self, surface, image, position):
+        rect = surface.blit(image, position)
+        self.drawn_rects.append(rect)
+        return rect
+
+    def add_drawn(self, rects):
+        """Record rects drawn directly on the surface so they are pushed now and erased next frame"""
+        self.drawn_rects.extend(rects)
+
+    def add_dirty(self, rect):
+        """Push a rect that changed without being drawn through the renderer, such as a HUD label"""
+        self.dirty_rects.append(rect)
+
+    def present(self, surface):
+        screen_area = surface.get_width() * surface.get_height()
+        rects = self.dirty_rects + self.drawn_rects
+        if not self.full_frame:
+            self.pixels_pushed = sum(rect.width * rect.height for rect in rects)
+            self.full_frame = self.pixels_pushed > FULL_REDRAW_RATIO * screen_area
+
+        if self.full_frame:
+            pygame.display.update()
+            self.pixels_pushed = screen_area
+            self.full_redraw = False
+        else:
+            pygame.display.update(rects)
+
+        self.dirty_rects = []
+        self.total_pixels_pushed += self.pixels_pushed
+        self.frames += 1
+
+class OverlayCompositor(object):
+    """Darkened snapshot of the last game frame, drawn behind the pause and game-over menus.
+
+    capture() copies the screen when gameplay is left and compose() darkens it once when
+    an overlay menu is entered, so each frame only blits the finished background and
+    draws the GUI over it. The buffers are allocated once and reused for every pause.
+    """
+
+    def __init__(self, size, darkness=190, background=(0, 0, 0)):
+        self.size = size
+        self.darkness = darkness
+        self.background = background
+        self.snapshot = None
+        self.composed = None
+        self.shade = None
+        self.has_snapshot = False
+
+    def allocate(self):
+        #Surfaces are created on first use because converting them needs a display
+        if self.composed is None:
+            self.snapshot = pygame.Surface(self.size).convert()
+            self.composed = pygame.Surface(self.size).convert()
+            self.shade = pygame.Surface(self.size).convert()
+            self.shade.fill(self.background)
+            self.shade.set_alpha(self.darkness)
+
+    def capture(self, surface):
+        self.allocate()
+        self.snapshot.blit(surface, (0, 0))
+        self.has_snapshot = True
+
+    def release(self):
+        """Forget the snapshot, so the next overlay is drawn over a plain background"""
+        self.has_snapshot = False
+
+    def compose(self):
+        self.allocate()
+        if self.has_snapshot:
+            self.composed.blit(self.snapshot, (0, 0))
+        else:
+            self.composed.fill(self.background)
+        self.composed.blit(self.shade, (0, 0))
+
+    def draw(self, surface):
+        surface.blit(self.composed, (0, 0))
@@ -0,0 +1,167 @@
+import io
+import os
+import struct
+from datetime import datetime
+from pygame.locals import K_DOWN, K_LEFT, K_RIGHT, K_UP
+
+#A replay holds everything that decides a game's outcome: the seed, the meteor count,
+#the meteor speed range, the spacecraft speed, whether the default waves were on, and
+#the time step and arrow keys of every update. Consecutive updates with the same keys
+#and time step are stored as one run. All values are little-endian:
+#   header   magic "SREP", version (u8), seed (i64), meteor count (u32), waves (u8), tick rate (u32),
+#            meteor speed low (u32), meteor speed high (u32), spacecraft speed (f64)
+#   runs     update count (varint), keys held (u8), time step change in ticks (zigzag varint)
+#   trailer  0 (varint), final score (varint), crashed (u8)
+MAGIC = b"SREP"
+VERSION = 5
+HEADER = struct.Struct("<4sBqIBIIId")
+#Time steps are stored as whole ticks; 1/120, 1/60 and 1/30 s are all exact
+TICK_RATE = 1200000
+REPLAY_KEYS = (K_LEFT, K_RIGHT, K_UP, K_DOWN)
+WRITE_BUFFER = 64 * 1024
+
+def new_replay_path(directory, now=None):
+    """A path in directory for a replay named after the time it starts. A counter is added
+    when a replay from the same second is already there, so no recording is overwritten."""
+    stem = (now or datetime.now()).strftime("%Y%m%d-%H%M%S")
+    path = os.path.join(directory, stem + ".replay")
+    number = 1
+    while os.path.exists(path):
+        number += 1
+        path = os.path.join(directory, "{}-{}.replay".format(stem, number))
+    return path
+
+class KeyState(frozenset):
+    """A set of held key codes that can be indexed like pygame.key.get_pressed()"""
+    def __getitem__(self, key):
+        return key in self
+
+def pack_keys(pressed):
+    bits = 0
+    for bit, key in enumerate(REPLAY_KEYS):
+        if pressed[key]:
+            bits |= 1 << bit
+    return bits
+
+def unpack_keys(bits):
+    return KeyState(key for bit, key in enumerate(REPLAY_KEYS) if bits & (1 << bit))
+
+def write_varint(output, value):
+    while value >= 0x80:
+        output.append((value & 0x7f) | 0x80)
+        value >>= 7
+    output.append(value)
+
+def read_varint(data, offset):
+    value = 0
+    shift = 0
+    while True:
+        byte = data[offset]
+        offset += 1
+        value |= (byte & 0x7f) << shift
+        if byte < 0x80:
+            return value, offset
+        shift += 7
+
+def zigzag(value):
+    return (value << 1) if value >= 0 else ((-value << 1) - 1)
+
+def unzigzag(value):
+    return (value >> 1) if not value & 1 else -((value + 1) >> 1)
+
+class ReplayRecorder(object):
+    """Streams a game to a replay file while it is played.
+
+    The recorder stands in for the game's input source, noting the keys each update
+    reads, and record_time() rounds each time step to whole ticks so that playback
+    feeds the game exactly the values it saw.
+    """
+
+    def __init__(self, path, seed, meteor_count, meteor_speed_range, spacecraft_speed, waves, source):
+        self.source = source
+        self.file = io.open(path, "wb", buffering=WRITE_BUFFER)
+        self.file.write(HEADER.pack(MAGIC, VERSION, seed, meteor_count, 1 if waves else 0, TICK_RATE,
+                                    meteor_speed_range[0], meteor_speed_range[1], spacecraft_speed))
+        self.ticks = 0
+        self.written_ticks = 0
+        self.run_keys = None
+        self.run_ticks = None
+        self.run_length = 0
+
+    def record_time(self, time_passed):
+        self.ticks = round(time_passed * TICK_RATE)
+        return self.ticks / TICK_RATE
+
+    def get_pressed(self):
+        pressed = self.source.get_pressed()
+        keys = pack_keys(pressed)
+        if keys == self.run_keys and self.ticks == self.run_ticks:
+            self.run_length += 1
+        else:
+            self.write_run()
+            self.run_keys = keys
+            self.run_ticks = self.ticks
+            self.run_length = 1
+        return pressed
+
+    def write_run(self):
+        if not self.run_length:
+            return
+        record = bytearray()
+        write_varint(record, self.run_length)
+        record.append(self.run_keys)
+        write_varint(record, zigzag(self.run_ticks - self.written_ticks))
+        self.file.write(record)
+        self.written_ticks = self.run_ticks
+
+    def close(self, score, crashed):
+        self.write_run()
+        trailer = bytearray()
+        write_varint(trailer, 0)
+        write_varint(trailer, score)
+        trailer.append(1 if crashed else 0)
+        self.file.write(trailer)
+        self.file.close()
+
+class ReplayPlayer(object):
+    """Reads a replay back. time_steps() yields each update's time step, and while it runs
+    the player is the input source that reports the keys held on that update."""
+
+    def __init__(self, path):
+        with open(path, "rb") as replay_file:
+            data = replay_file.read()
+        #The magic and version decide the header's layout, so they are checked before it is read
+        if data[:len(MAGIC)] != MAGIC or len(data) <= len(MAGIC) or data[len(MAGIC)] != VERSION or len(data) < HEADER.size:
+            raise ValueError("{} is not a version {} replay".format(path, VERSION))
+        (_, _, self.seed, self.meteor_count, waves, self.tick_rate,
+         speed_low, speed_high, self.spacecraft_speed) = HEADER.unpack_from(data)
+        self.meteor_speed_range = (speed_low, speed_high)
+        self.waves = bool(waves)
+
+        self.runs = []
+        offset = HEADER.size
+        ticks = 0
+        try:
+            while True:
+                length, offset = read_varint(data, offset)
+                if not length:
+                    break
+                keys = data[offset]
+                delta, offset = read_varint(data, offset + 1)
+                ticks += unzigzag(delta)
+                self.runs.append((length, unpack_keys(keys), ticks / self.tick_rate))
+            self.score, offset = read_varint(data, offset)
+            self.crashed = bool(data[offset])
+        except IndexError:
+            raise ValueError("{} is truncated".format(path)) from None
+        self.frames = sum(run[0] for run in self.runs)
+        self.keys = KeyState()
+
+    def time_steps(self):
+        for length, keys, time_passed in self.runs:
+            self.keys = keys
+            for _ in range(length):
+                yield time_passed
+
+    def get_pressed(self):
+        return self.keys
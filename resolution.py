@@ -0,0 +1,79 @@
+import pygame
+from image_cache import image_cache
+
+#Layout and gameplay work in these units whatever the size frames are drawn at
+LOGICAL_SIZE = (1366, 768)
+#Render scales to choose from, largest first
+RENDER_SCALES = (1.0, 0.75, 0.5)
+GUI_FONT_SIZE = 14
+#pygame_gui element types whose text is drawn with the default font; nested elements
+#such as selection list items and dialog title bars are themed through these
+GUI_TEXT_ELEMENTS = ("button", "label", "text_box", "text_entry_line")
+
+class RenderResolution(object):
+    """Maps logical units to the pixels of the surface frames are drawn on.
+
+    Frames are drawn scale times the logical size and the display (opened SCALED)
+    stretches them to the screen, so a smaller scale trades sharpness for fill and
+    blit cost without moving anything in the layout or changing gameplay.
+    """
+
+    def __init__(self, scale=1.0, logical_size=LOGICAL_SIZE):
+        self.scale = scale
+        self.logical_size = logical_size
+        self.size = (round(logical_size[0] * scale), round(logical_size[1] * scale))
+
+    def length(self, value):
+        return round(value * self.scale)
+
+    def point(self, position):
+        return (round(position[0] * self.scale), round(position[1] * self.scale))
+
+    def rect(self, position, size):
+        """A pygame.Rect in render pixels from a position and size in logical units"""
+        left, top = self.point(position)
+        right, bottom = self.point((position[0] + size[0], position[1] + size[1]))
+        return pygame.Rect(left, top, right - left, bottom - top)
+
+    def image(self, path):
+        """The cached image at path, scaled to this resolution"""
+        if self.scale == 1.0:
+            return image_cache.get(path)
+        return image_cache.get(path, scale=self.scale)
+
+    def gui_theme(self):
+        font = {"name": "noto_sans", "size": str(self.length(GUI_FONT_SIZE))}
+        return {element: {"font": font} for element in GUI_TEXT_ELEMENTS}
+
+class ResolutionGovernor(object):
+    """Picks the render scale for the next game from how long the last one's frames took.
+
+    Each gameplay frame's working time (everything but waiting for the next frame) is
+    recorded. If the slow end of a game's frames went over the frame budget the scale
+    steps down; once they fit well within it the scale steps back up.
+    """
+
+    def __init__(self, budget, scales=RENDER_SCALES, percentile=90, over=1.0, under=0.5, min_frames=120):
+        self.budget = budget
+        self.scales = scales
+        self.percentile = percentile
+        self.over = over
+        self.under = under
+        self.min_frames = min_frames
+        self.samples = []
+
+    def record(self, work_time):
+        self.samples.append(work_time)
+
+    def next_scale(self, scale):
+        samples = sorted(self.samples)
+        self.samples = []
+        if len(samples) < self.min_frames:
+            return scale
+        slow = samples[min(len(samples) - 1, round(self.percentile / 100.0 * (len(samples) - 1)))]
+        index = self.scales.index(scale) if scale in self.scales else 0
+        if slow > self.budget * self.over and index < len(self.scales) - 1:
+            return self.scales[index + 1]
+        if slow < self.budget * self.under and index > 0:
+            return self.scales[index - 1]
+        return scale
@@ -0,0 +1,50 @@
+from sqlalchemy import func, select
+from sqlalchemy.dialects.sqlite import insert
+from models import DailyRollup, PlayerRollup, ScoreCount, TopScore, TOP_SCORES_KEPT
+
+def upsert(table, key, add, keep_max=()):
+    """An insert into table that folds a row whose key already exists into the existing
+    one, adding up the add columns and keeping the largest of the keep_max columns"""
+    statement = insert(table)
+    values = {column: getattr(table, column) + statement.excluded[column] for column in add}
+    values.update({column: func.max(getattr(table, column), statement.excluded[column]) for column in keep_max})
+    return statement.on_conflict_do_update(index_elements=[key], set_=values)
+
+def record_scores(session, scores):
+    """Fold new scores, (player_id, score, date) tuples, into the rollups in the session's transaction.
+
+    Each rollup takes one upsert per batch, so writing a score costs the same however
+    many scores have been recorded before it.
+    """
+    players = {}
+    days = {}
+    counts = {}
+    for player_id, score, date in scores:
+        if player_id is not None:
+            games, total, best, last_played = players.get(player_id, (0, 0, score, date))
+            players[player_id] = (games + 1, total + score, max(best, score), max(last_played, date))
+        games, total, best = days.get(date.date(), (0, 0, score))
+        days[date.date()] = (games + 1, total + score, max(best, score))
+        counts[score] = counts.get(score, 0) + 1
+
+    if players:
+        session.execute(upsert(PlayerRollup, "player_id", add=("games", "total"), keep_max=("best", "last_played")),
+                        [{"player_id": player_id, "games": games, "total": total, "best": best, "last_played": last_played}
+                         for player_id, (games, total, best, last_played) in players.items()])
+    session.execute(upsert(DailyRollup, "day", add=("games", "total"), keep_max=("best",)),
+                    [{"day": day, "games": games, "total": total, "best": best} for day, (games, total, best) in days.items()])
+    session.execute(upsert(ScoreCount, "score", add=("games",)),
+                    [{"score": score, "games": games} for score, games in counts.items()])
+    record_top_scores(session, scores)
+
+def record_top_scores(session, scores):
+    kept = session.execute(select(func.count(), func.min(TopScore.score))).one()
+    threshold = kept[1] if kept[0] >= TOP_SCORES_KEPT else None
+    #Equal scores keep their order of arrival, so a new score has to beat the lowest one kept
+    rows = [{"player_id": player_id, "score": score, "date": date} for player_id, score, date in scores
+            if player_id is not None and (threshold is None or score > threshold)]
+    if not rows:
+        return
+    session.execute(insert(TopScore), rows)
+    kept_ids = select(TopScore.id).order_by(TopScore.score.desc(), TopScore.id).limit(TOP_SCORES_KEPT)
+    session.execute(TopScore.__table__.delete().where(TopScore.id.not_in(kept_ids)))
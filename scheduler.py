@@ -0,0 +1,82 @@
+import time
+
+DEFAULT_FPS = 60
+POWER_SAVE_FPS = 30
+SPIN_MARGIN = 0.002
+SMOOTHING = 0.25
+CPU_SMOOTHING = 0.05
+
+class FrameScheduler(object):
+    """Paces the main loop for every state and hands out the time each frame took.
+
+    tick() sleeps until shortly before the frame's deadline and then spins for the
+    remaining time, which is far more precise than sleeping alone. When presentation
+    is vsynced at or below the target rate the display flip already paces the loop,
+    so no extra waiting is done. In power-save mode frame rates are capped lower and
+    the spin is skipped, trading pacing precision for idle CPU.
+    """
+
+    def __init__(self, default_fps=DEFAULT_FPS, power_save=False, vsync_rate=None, smoothing=SMOOTHING):
+        self.default_fps = default_fps
+        self.power_save = power_save
+        self.vsync_rate = vsync_rate
+        self.smoothing = smoothing
+        self.last_frame = time.perf_counter()
+        self.last_cpu = time.process_time()
+        self.frame_time = 0.0
+        self.smoothed_frame_time = None
+        self.cpu_usage = 0.0
+
+    def target_interval(self, fps):
+        fps = fps or self.default_fps
+        if self.power_save:
+            fps = min(fps, POWER_SAVE_FPS)
+        if self.vsync_rate and fps >= self.vsync_rate:
+            return 0.0
+        return 1.0 / fps
+
+    def wait_until(self, deadline):
+        remaining = deadline - time.perf_counter()
+        if self.power_save:
+            if remaining > 0:
+                time.sleep(remaining)
+            return
+
+        if remaining > SPIN_MARGIN:
+            time.sleep(remaining - SPIN_MARGIN)
+        while time.perf_counter() < deadline:
+            pass
+
+    def tick(self, fps=None):
+        """Wait out the rest of the frame and return its smoothed duration in seconds"""
+        interval = self.target_interval(fps)
+        if interval:
+            self.wait_until(self.last_frame + interval)
+
+        self.measure()
+        if self.smoothed_frame_time is None:
+            self.smoothed_frame_time = self.frame_time
+        else:
+            self.smoothed_frame_time += self.smoothing * (self.frame_time - self.smoothed_frame_time)
+        return self.smoothed_frame_time
+
+    def resume(self):
+        """Return the unsmoothed time since the last frame, for loops that slept on input instead of being paced"""
+        self.measure()
+        return self.frame_time
+
+    def measure(self):
+        now = time.perf_counter()
+        cpu_now = time.process_time()
+        self.frame_time = now - self.last_frame
+        if self.frame_time > 0:
+            usage = (cpu_now - self.last_cpu) / self.frame_time
+            self.cpu_usage += CPU_SMOOTHING * (usage - self.cpu_usage)
+        self.last_frame = now
+        self.last_cpu = cpu_now
+
+    def reset(self):
+        """Start timing afresh, e.g. after a state transition that blocked for a while"""
+        self.last_frame = time.perf_counter()
+        self.last_cpu = time.process_time()
+        self.smoothed_frame_time = None
@@ -3,73 +3,218 @@ import pygame_gui
 from pygame.locals import *
 from abc import ABCMeta, abstractmethod
 from vector2 import Vector2
-from random import randint
+from meteor_field import MeteorField
+from broadphase import ArrayScan
+from waves import DEFAULT_WAVES, WaveScheduler, waves_capacity
+from image_cache import image_cache, load_font
+from renderer import DirtyRectRenderer, OverlayCompositor
+from hud import HUD, GlyphAtlas
+from replay import KeyState, ReplayPlayer, ReplayRecorder, new_replay_path
+from profiler import FrameProfiler
+from scheduler import FrameScheduler
+from resolution import LOGICAL_SIZE, RENDER_SCALES, RenderResolution, ResolutionGovernor
+from collections import namedtuple
+import numpy as np
+import argparse
+import threading
+import logging
 import time
 import csv
 import os
 from pathlib import Path
-from models import Player, Score, Session
-
-SCREEN_SIZE = (1366, 768)
+from models import DEFAULT_DATABASE_URL, Player, Session, delete_player, get_engine, init_db
+from archive import ARCHIVE_DIRECTORY, archive_scores
+from persistence import ScoreWriter
+from leaderboard import Leaderboard
+from player_directory import PlayerDirectory
+from sqlalchemy.orm.attributes import set_committed_value
+
+#Gameplay and menu layout are in logical units, which GameApp.resolution maps to pixels
+SCREEN_SIZE = LOGICAL_SIZE
 WHITE = (255, 255, 255)
 BLACK = (0, 0, 0)
 SPACECRAFT_SPEED = 400
+METEOR_COUNT = 10
+METEOR_SPEED_RANGE = (800, 1000)
+#Gameplay always advances in steps of this length, however often frames are drawn
+SIMULATION_TIMESTEP = 1/120.0
+#Frames longer than this are cut short, so a long stall slows the game rather than
+#making it catch up in one burst
+MAX_FRAME_TIME = 0.25
+MENU_FPS = 60
+#Idle menus stay awake this long after input so hover and press animations play out
+IDLE_AWAKE_TIME = 0.25
+IDLE_TIMEOUT_MS = 1000
+CURSOR_BLINK_MS = 400
+GAMEPLAY_FPS = 120
+SIMULATION_MAX_TIME = 600.0
+#Collision masks keep a bit per pixel at 1. At 2 or 4 a bit covers a block of pixels, which
+#is cheaper and never misses a hit but can report one up to a block early.
+COLLISION_MASK_RESOLUTION = 1
 
 INTRO_SCREEN_FILE = "images/SplashScreenImage.png"
 ABOUT_FILE = "README.md"
+NUMBER_FONT_FILE = "freesansbold.ttf"
+HUD_FONT_SIZE = 16
+COUNTDOWN_FONT_SIZE = 96
+COUNTDOWN_TEXT = ("3", "2", "1", "GO!")
+GAME_IMAGE_FILES = ("images/space_craft.png", "images/meteor.png")
+#pygame_gui fonts the menus use beyond the theme's default
+GUI_FONTS = [{"name": "noto_sans", "point_size": 14, "style": "bold", "antialiased": "1"}]
+
+def ui_rect(position, size):
+    """A pygame.Rect in render pixels for a position and size in logical units"""
+    return GameApp.resolution.rect(position, size)
+
+def log_failed_write(future):
+    """ScoreWriter callback: nothing waits on the write, so a failure is only seen in the log"""
+    if future.exception() is not None:
+        logging.error("Saving a score failed", exc_info=future.exception())
+
+SimulationResult = namedtuple("SimulationResult", ["seed", "score", "frames", "sim_time", "crashed"])
+
+class KeyboardInput(object):
+    def get_pressed(self):
+        return pygame.key.get_pressed()
+
+class ScriptedInput(object):
+    """Input source driven by a script callable that maps a frame number to the keys held on that frame"""
+    def __init__(self, script=None):
+        self.script = script
+        self.frame = 0
+
+    def get_pressed(self):
+        keys = self.script(self.frame) if self.script else ()
+        self.frame += 1
+        return KeyState(keys)
 
 class MenuStateMachine(object):
-    def __init__(self):
+    def __init__(self, profiler=None, scheduler=None):
         self.states =  {}
+        self.factories = {}
         self.active_state = None
+        self.profiler = profiler if profiler is not None else FrameProfiler()
+        self.scheduler = scheduler if scheduler is not None else FrameScheduler()
     
     def add_state(self, state):
         self.states[state.name] = state
 
+    def discard_states(self):
+        """Discard every built state and forget it, so each is built afresh when next entered"""
+        for state in self.states.values():
+            state.discard()
+        self.states.clear()
+
+    def register(self, name, factory):
+        """Build the state with factory(name) the first time it is entered"""
+        self.factories[name] = factory
+
+    def get_state(self, name):
+        state = self.states.get(name)
+        if state is None:
+            state = self.factories[name](name)
+            self.add_state(state)
+        return state
+
     def process(self):
+        profiler = self.profiler
         while 1:
             if self.active_state is None:
                 return
 
-            self.active_state.do_actions()
-            
-            new_state_name = self.active_state.check_conditions()
+            state = self.active_state
+            if state.idle and time.perf_counter() >= state.awake_until:
+                state.wait_for_event()
+                state.time_delta = self.scheduler.resume()
+            else:
+                state.time_delta = self.scheduler.tick(state.target_fps)
+
+            with profiler.phase(state.name, "frame"):
+                with profiler.phase(state.name, "do_actions"):
+                    state.do_actions()
+
+                with profiler.phase(state.name, "check_conditions"):
+                    new_state_name = state.check_conditions()
+
+            if profiler.enabled:
+                profiler.gauges["fps"] = 1.0 / state.time_delta if state.time_delta else 0.0
+                profiler.gauges["cpu %"] = self.scheduler.cpu_usage * 100.0
+                profiler.end_frame(GameApp.screen, state.name)
 
             if new_state_name is not None:
                 self.set_state(new_state_name)
 
     def set_state(self, new_state_name):
         if self.active_state is not None:
-            self.active_state.exit_actions()
-
-        self.active_state = self.states[new_state_name]
-        self.active_state.entry_actions()
+            with self.profiler.phase(self.active_state.name, "exit_actions"):
+                self.active_state.exit_actions()
+            self.active_state.container.hide()
+
+        self.active_state = self.get_state(new_state_name)
+        self.active_state.container.show()
+        with self.profiler.phase(new_state_name, "entry_actions"):
+            self.active_state.entry_actions()
+        self.active_state.wake()
+        #Transitions can block (countdowns, dialogs), which must not count as frame time
+        self.scheduler.reset()
 
 class GameState(metaclass=ABCMeta):
+    target_fps = MENU_FPS
+    #Static menus set this to only redraw when input arrives, the GUI animates or a timer fires
+    idle = False
+
     def __init__(self, name):
         self.name = name
-        self.gui_manager = pygame_gui.UIManager(SCREEN_SIZE)
+        #All states share one UIManager, so the theme and fonts load once; each state's
+        #elements live in its own container, which is only shown while the state is active
+        self.gui_manager = GameApp.gui_manager
+        self.container = pygame_gui.core.UIContainer(pygame.Rect((0, 0), GameApp.resolution.size), self.gui_manager, visible=0)
         self.time_delta = 0.0
-        self.internal_clock = pygame.time.Clock()
+        self.pending_events = []
+        self.awake_until = 0.0
+        self.gui_images = []
         self.initialize_gui_elements()
 
     def initialize_gui_elements(self):
         pass
 
-    def do_actions(self, backfill=True):
-        self.time_delta = GameApp.game_clock.tick(120)/1000.0
+    def discard(self):
+        """Release what the state holds before it is thrown away"""
+        self.container.kill()
+
+    def get_events(self):
+        events = self.pending_events + pygame.event.get()
+        self.pending_events = []
+        return events
+
+    def wake(self, duration=IDLE_AWAKE_TIME):
+        self.awake_until = max(self.awake_until, time.perf_counter() + duration)
+
+    def wait_for_event(self):
+        """Block until input arrives or the idle timer fires, keeping the event for check_conditions"""
+        #A focused text entry needs its cursor blinked, everything else only a slow heartbeat
+        timeout = CURSOR_BLINK_MS if self.gui_manager.get_focus_set() else IDLE_TIMEOUT_MS
+        event = pygame.event.wait(timeout)
+        if event.type != NOEVENT:
+            self.pending_events.append(event)
+            self.wake()
+
+    def gui_changed(self):
+        #pygame_gui swaps in a new image whenever an element's look changes
+        images = [sprite.image for sprite in self.gui_manager.get_sprite_group().sprites()]
+        changed = len(images) != len(self.gui_images) or any(new is not old for new, old in zip(images, self.gui_images))
+        self.gui_images = images
+        return changed
 
+    def do_actions(self, backfill=True):
         if backfill:
             GameApp.screen.fill(BLACK)
         else:
-            if GameApp.old_screen:
-                GameApp.screen.blit(GameApp.old_screen, (0,0))
-            darkening = pygame.Surface((1366, 768))
-            darkening.set_alpha(190)
-            darkening.fill((0, 0, 0))
-            GameApp.screen.blit(darkening, (0,0))
+            GameApp.overlay.draw(GameApp.screen)
 
         self.gui_manager.update(self.time_delta)
+        if self.idle and self.gui_changed():
+            self.wake()
         self.gui_manager.draw_ui(GameApp.screen)
         pygame.display.update()
         
@@ -83,45 +228,78 @@ class GameState(metaclass=ABCMeta):
         pass
         
 class SplashScreenMenu(GameState):
+    def __init__(self, name):
+        super().__init__(name)
+        self.preload_thread = None
+        self.preload_error = None
+
     def do_actions(self):
-        GameApp.screen.fill(BLACK)
-        intro_screen_image = pygame.image.load(INTRO_SCREEN_FILE).convert_alpha()
-        i_w, i_h = intro_screen_image.get_size()
-        GameApp.screen.blit(intro_screen_image, ((SCREEN_SIZE[0]/2)-(i_w/2), (SCREEN_SIZE[1]/2)-(i_h/2)))
-        pygame.display.update()
-        time.sleep(3)
+        pygame.event.pump()
 
     def check_conditions(self):
-        return "select_player"
+        #The splash was presented in entry_actions, so it moves on as soon as preloading is done
+        if not self.preload_thread.is_alive():
+            self.preload_thread.join()
+            if self.preload_error is not None:
+                #Raised here, on the main thread, rather than lost with the preload thread
+                raise self.preload_error
+            return "select_player"
 
     def entry_actions(self):
         pygame.mouse.set_visible(False)
+        GameApp.screen.fill(BLACK)
+        intro_screen_image = GameApp.resolution.image(INTRO_SCREEN_FILE)
+        GameApp.screen.blit(intro_screen_image.surface, intro_screen_image.surface.get_rect(center=GameApp.screen.get_rect().center))
+        pygame.display.update()
+
+        #The splash is only drawn once, so nothing else touches the caches or the session until the thread is done
+        self.preload_error = None
+        self.preload_thread = threading.Thread(target=self.preload, name="preload", daemon=True)
+        self.preload_thread.start()
+
+    def preload(self):
+        try:
+            GameApp.preload()
+        except BaseException as error:
+            self.preload_error = error
 
     def exit_actions(self):
         pygame.mouse.set_visible(True)
 
 class SelectPlayerMenu(GameState):
+    idle = True
+
     def initialize_gui_elements(self):
-        pygame_gui.elements.ui_label.UILabel(relative_rect=pygame.Rect((384, 100), (600, 40)), text="SELECT A PLAYER", manager=self.gui_manager)
-        pygame_gui.elements.ui_label.UILabel(relative_rect=pygame.Rect((384, 150), (600, 40)), text="TO CREATE A NEW PLAYER PRESS 'C'", manager=self.gui_manager)
-        pygame_gui.elements.ui_label.UILabel(relative_rect=pygame.Rect((384, 200), (600, 40)), text="TO DELETE A PLAYER PRESS 'X'", manager=self.gui_manager)
+        pygame_gui.elements.ui_label.UILabel(relative_rect=ui_rect((384, 100), (600, 40)), text="SELECT A PLAYER", manager=self.gui_manager, container=self.container)
+        pygame_gui.elements.ui_label.UILabel(relative_rect=ui_rect((384, 150), (600, 40)), text="TO CREATE A NEW PLAYER PRESS 'C'", manager=self.gui_manager, container=self.container)
+        pygame_gui.elements.ui_label.UILabel(relative_rect=ui_rect((384, 200), (600, 40)), text="TO DELETE A PLAYER PRESS 'X'", manager=self.gui_manager, container=self.container)
+
+        self.filter_box = pygame_gui.elements.UITextEntryLine(relative_rect=ui_rect((384, 250), (600, 35)), manager=self.gui_manager, container=self.container, placeholder_text="Type to filter, PAGE UP/DOWN to scroll")
+        self.selection_list = pygame_gui.elements.ui_selection_list.UISelectionList(relative_rect= ui_rect((384, 285), (600, 265)), item_list= [], manager=self.gui_manager, container=self.container)
 
-        my_list = []
-        for player in GameApp.get_player_list():
-            my_list.append(player[0])
-                    
-        self.selection_list = pygame_gui.elements.ui_selection_list.UISelectionList(relative_rect= pygame.Rect((384,250), (600,300)), item_list= my_list, manager= self.gui_manager)
+        self.delete_player_button = pygame_gui.elements.ui_button.UIButton(relative_rect=ui_rect((384, 550), (175, 40)), text="DELETE", manager=self.gui_manager, container=self.container)
+        self.create_player_button = pygame_gui.elements.ui_button.UIButton(relative_rect=ui_rect((598, 550), (175, 40)), text="CREATE NEW", manager=self.gui_manager, container=self.container)
+        self.continue_button = pygame_gui.elements.ui_button.UIButton(relative_rect=ui_rect((810, 550), (174, 40)), text="CONTINUE", manager=self.gui_manager, container=self.container)
 
-        self.delete_player_button = pygame_gui.elements.ui_button.UIButton(relative_rect=pygame.Rect((384, 550), (175, 40)), text="DELETE", manager=self.gui_manager)
-        self.create_player_button = pygame_gui.elements.ui_button.UIButton(relative_rect=pygame.Rect((598, 550), (175, 40)), text="CREATE NEW", manager=self.gui_manager)
-        self.continue_button = pygame_gui.elements.ui_button.UIButton(relative_rect=pygame.Rect((810, 550), (174, 40)), text="CONTINUE", manager=self.gui_manager)
+        #Name of the last player on each page before the current one, for paging back
+        self.page_cursors = [None]
+        self.page = []
 
     def refresh_gui_elements(self):
-        my_list = []
-        for player in GameApp.get_player_list():
-            my_list.append(player[0])
+        self.page = GameApp.player_directory.page(self.filter_box.get_text(), self.page_cursors[-1])
+        self.selection_list.set_item_list([player[0] for player in self.page])
 
-        self.selection_list.set_item_list(my_list)
+    def next_page(self):
+        if len(self.page) == GameApp.player_directory.page_size:
+            self.page_cursors.append(self.page[-1][0])
+            self.refresh_gui_elements()
+            if not self.page:
+                self.previous_page()
+
+    def previous_page(self):
+        if len(self.page_cursors) > 1:
+            self.page_cursors.pop()
+            self.refresh_gui_elements()
 
     def do_actions(self):
         if self.selection_list.get_single_selection() == None:
@@ -134,7 +312,7 @@ class SelectPlayerMenu(GameState):
         super().do_actions()
 
     def check_conditions(self):
-        for event in pygame.event.get():
+        for event in self.get_events():
             self.gui_manager.process_events(event)
             if event.type == KEYDOWN:
                 if event.key == K_RETURN:
@@ -149,13 +327,20 @@ class SelectPlayerMenu(GameState):
                 elif event.key == K_UP:
                     #Keyboard navigation desirable for selection-list
                     return None
+                elif event.key == K_PAGEDOWN:
+                    self.next_page()
+                elif event.key == K_PAGEUP:
+                    self.previous_page()
+                elif self.filter_box.is_focused:
+                    #Letters typed into the filter are not shortcuts
+                    continue
                 elif event.key == K_c:
                     return "create_player"
                 elif event.key == K_x:
-                    if len(GameApp.player_list) > 0:
+                    if self.page:
                         GameApp.player_buff = GameApp.session.query(Player).filter_by(name=self.selection_list.get_single_selection()).first()
                         if GameApp.player_buff:
-                            self.confirm_dialog = pygame_gui.windows.ui_confirmation_dialog.UIConfirmationDialog(rect=pygame.Rect((503,259), (360, 250)), manager=self.gui_manager, window_title="DELETE PLAYER!", action_short_name="Delete", action_long_desc="Are you sure you want to delete '" + GameApp.player_buff.name + "'? This cannot be undone!", blocking=True)
+                            self.confirm_dialog = pygame_gui.windows.ui_confirmation_dialog.UIConfirmationDialog(rect=ui_rect((503, 259), (360, 250)), manager=self.gui_manager, window_title="DELETE PLAYER!", action_short_name="Delete", action_long_desc="Are you sure you want to delete '" + GameApp.player_buff.name + "'? This cannot be undone!", blocking=True)
                         return None
 
             if event.type == pygame.USEREVENT:
@@ -164,30 +349,37 @@ class SelectPlayerMenu(GameState):
                         GameApp.current_player = GameApp.session.query(Player).filter_by(name=self.selection_list.get_single_selection()).first()
                         return "main_menu"
                     elif event.ui_element == self.delete_player_button:
-                        if len(GameApp.player_list) > 0:
+                        if self.page:
                             GameApp.player_buff = GameApp.session.query(Player).filter_by(name=self.selection_list.get_single_selection()).first()
                             if GameApp.player_buff:
-                                self.confirm_dialog = pygame_gui.windows.ui_confirmation_dialog.UIConfirmationDialog(rect=pygame.Rect((503,259), (360, 250)), manager=self.gui_manager, window_title="Delete", action_short_name="Delete", action_long_desc="Are you sure you want to Delete this player? This cannot be undone!", blocking=True)
+                                self.confirm_dialog = pygame_gui.windows.ui_confirmation_dialog.UIConfirmationDialog(rect=ui_rect((503, 259), (360, 250)), manager=self.gui_manager, window_title="Delete", action_short_name="Delete", action_long_desc="Are you sure you want to Delete this player? This cannot be undone!", blocking=True)
                         return None
                     elif event.ui_element == self.create_player_button:
                         return "create_player"
+                elif event.user_type == pygame_gui.UI_TEXT_ENTRY_CHANGED:
+                    if event.ui_element == self.filter_box:
+                        self.page_cursors = [None]
+                        self.refresh_gui_elements()
                 elif event.user_type == pygame_gui.UI_CONFIRMATION_DIALOG_CONFIRMED:
                     if event.ui_element == self.confirm_dialog:
-                        GameApp.session.delete(GameApp.player_buff)
+                        delete_player(GameApp.session, GameApp.player_buff)
+                        GameApp.session.commit()
+                        GameApp.player_directory.invalidate()
                         GameApp.refresh_high_scores()
                         self.refresh_gui_elements()
                         return None
 
     def entry_actions(self):
-        GameApp.player_list = GameApp.get_player_list()
         self.refresh_gui_elements()
 
 class CreatePlayerMenu(GameState):
+    idle = True
+
     def initialize_gui_elements(self):
-        pygame_gui.elements.ui_label.UILabel(relative_rect=pygame.Rect((384, 100), (600, 40)), text="CREATE A NEW PLAYER", manager=self.gui_manager)
-        self.text_box = pygame_gui.elements.UITextEntryLine(relative_rect=pygame.Rect((384, 200), (600, 40)), manager=self.gui_manager)
-        self.cancel_button = pygame_gui.elements.ui_button.UIButton(relative_rect=pygame.Rect((480, 350), (175, 40)), text="CANCEL", manager=self.gui_manager)
-        self.save_button = pygame_gui.elements.ui_button.UIButton(relative_rect=pygame.Rect((700, 350), (175, 40)), text="SAVE", manager=self.gui_manager)
+        pygame_gui.elements.ui_label.UILabel(relative_rect=ui_rect((384, 100), (600, 40)), text="CREATE A NEW PLAYER", manager=self.gui_manager, container=self.container)
+        self.text_box = pygame_gui.elements.UITextEntryLine(relative_rect=ui_rect((384, 200), (600, 40)), manager=self.gui_manager, container=self.container)
+        self.cancel_button = pygame_gui.elements.ui_button.UIButton(relative_rect=ui_rect((480, 350), (175, 40)), text="CANCEL", manager=self.gui_manager, container=self.container)
+        self.save_button = pygame_gui.elements.ui_button.UIButton(relative_rect=ui_rect((700, 350), (175, 40)), text="SAVE", manager=self.gui_manager, container=self.container)
 
     def do_actions(self):
         if len(self.text_box.get_text()) <= 0:
@@ -198,7 +390,7 @@ class CreatePlayerMenu(GameState):
         super().do_actions()
         
     def check_conditions(self):
-        for event in pygame.event.get():
+        for event in self.get_events():
             self.gui_manager.process_events(event)
             if event.type == KEYDOWN:
                 if event.key == K_ESCAPE:
@@ -208,6 +400,8 @@ class CreatePlayerMenu(GameState):
                     if len(inp) > 0:
                         new_player = Player(name=inp)
                         GameApp.session.add(new_player)
+                        GameApp.session.commit()
+                        GameApp.player_directory.invalidate()
                         return "select_player"
                     else:
                         return None 
@@ -220,6 +414,8 @@ class CreatePlayerMenu(GameState):
                         if len(inp) > 0:
                             new_player = Player(name=inp)
                             GameApp.session.add(new_player)
+                            GameApp.session.commit()
+                            GameApp.player_directory.invalidate()
                             return "select_player"
                         else:
                             return None
@@ -231,15 +427,17 @@ class CreatePlayerMenu(GameState):
         pass
 
 class MainMenu(GameState):
+    idle = True
+
     def initialize_gui_elements(self):
-        self.new_game_btn = pygame_gui.elements.ui_button.UIButton(relative_rect=pygame.Rect((383, 160), (600, 40)), text="Start Game", manager=self.gui_manager)
-        self.change_plyr_btn = pygame_gui.elements.ui_button.UIButton(relative_rect=pygame.Rect((383, 210), (600, 40)), text="Change Current Player", manager=self.gui_manager)
-        self.hi_scores_btn = pygame_gui.elements.ui_button.UIButton(relative_rect=pygame.Rect((383, 260), (600, 40)), text="High Scores", manager=self.gui_manager)
-        self.about_btn = pygame_gui.elements.ui_button.UIButton(relative_rect=pygame.Rect((383, 310), (600, 40)), text="About This Game", manager=self.gui_manager)
-        self.exit_btn = pygame_gui.elements.ui_button.UIButton(relative_rect=pygame.Rect((383, 360), (600, 40)), text="Quit Game", manager=self.gui_manager)
+        self.new_game_btn = pygame_gui.elements.ui_button.UIButton(relative_rect=ui_rect((383, 160), (600, 40)), text="Start Game", manager=self.gui_manager, container=self.container)
+        self.change_plyr_btn = pygame_gui.elements.ui_button.UIButton(relative_rect=ui_rect((383, 210), (600, 40)), text="Change Current Player", manager=self.gui_manager, container=self.container)
+        self.hi_scores_btn = pygame_gui.elements.ui_button.UIButton(relative_rect=ui_rect((383, 260), (600, 40)), text="High Scores", manager=self.gui_manager, container=self.container)
+        self.about_btn = pygame_gui.elements.ui_button.UIButton(relative_rect=ui_rect((383, 310), (600, 40)), text="About This Game", manager=self.gui_manager, container=self.container)
+        self.exit_btn = pygame_gui.elements.ui_button.UIButton(relative_rect=ui_rect((383, 360), (600, 40)), text="Quit Game", manager=self.gui_manager, container=self.container)
 
     def check_conditions(self):
-        for event in pygame.event.get():
+        for event in self.get_events():
             self.gui_manager.process_events(event)
             if event.type == KEYDOWN:
                 if event.key == K_n:
@@ -251,7 +449,7 @@ class MainMenu(GameState):
                 elif event.key == K_c:
                     return "select_player"
                 elif event.key == K_ESCAPE:
-                    self.confirm_dialog = pygame_gui.windows.ui_confirmation_dialog.UIConfirmationDialog(rect=pygame.Rect((503,259), (360, 250)), manager=self.gui_manager, window_title="QUIT GAME", action_short_name="Quit", action_long_desc="Are you sure you want to quit the game?", blocking=True)
+                    self.confirm_dialog = pygame_gui.windows.ui_confirmation_dialog.UIConfirmationDialog(rect=ui_rect((503, 259), (360, 250)), manager=self.gui_manager, window_title="QUIT GAME", action_short_name="Quit", action_long_desc="Are you sure you want to quit the game?", blocking=True)
                     return None
             elif event.type == pygame.USEREVENT:
                 if event.user_type == pygame_gui.UI_BUTTON_PRESSED:
@@ -264,27 +462,21 @@ class MainMenu(GameState):
                     elif event.ui_element == self.about_btn:
                         return "about"
                     elif event.ui_element == self.exit_btn:
-                        self.confirm_dialog = pygame_gui.windows.ui_confirmation_dialog.UIConfirmationDialog(rect=pygame.Rect((503,259), (360, 250)), manager=self.gui_manager, window_title="QUIT GAME", action_short_name="Quit", action_long_desc="Are you sure you want to quit the game?", blocking=True)
+                        self.confirm_dialog = pygame_gui.windows.ui_confirmation_dialog.UIConfirmationDialog(rect=ui_rect((503, 259), (360, 250)), manager=self.gui_manager, window_title="QUIT GAME", action_short_name="Quit", action_long_desc="Are you sure you want to quit the game?", blocking=True)
                         return None
                 elif event.user_type == pygame_gui.UI_CONFIRMATION_DIALOG_CONFIRMED:
                     if event.ui_element == self.confirm_dialog:
-                        pygame.quit()
-                        exit()
+                        GameApp.quit()
 
 class HighScoresMenu(GameState):
+    idle = True
+
     def initialize_gui_elements(self):
-        self.build_scores_table()
-        self.title_label = pygame_gui.elements.ui_label.UILabel(relative_rect=pygame.Rect((383, 160), (600, 40)), text="HIGH SCORES", manager=self.gui_manager)
-        self.back_btn = pygame_gui.elements.ui_button.UIButton(relative_rect=pygame.Rect((383, 470), (175, 40)), text="BACK", manager=self.gui_manager)
+        self.high_scores_list = None
+        self.title_label = pygame_gui.elements.ui_label.UILabel(relative_rect=ui_rect((383, 160), (600, 40)), text="HIGH SCORES", manager=self.gui_manager, container=self.container)
+        self.back_btn = pygame_gui.elements.ui_button.UIButton(relative_rect=ui_rect((383, 470), (175, 40)), text="BACK", manager=self.gui_manager, container=self.container)
         self.build_scores_table()
 
-    def do_actions(self):
-        self.time_delta = self.internal_clock.tick(60)/1000.0
-        GameApp.screen.fill(BLACK)
-        self.gui_manager.update(self.time_delta)
-        self.gui_manager.draw_ui(GameApp.screen)
-        pygame.display.update()
-
     def build_scores_table(self):
         counter = 1
         self.score_string = ""
@@ -293,11 +485,12 @@ class HighScoresMenu(GameState):
             self.score_string += "{:>2}. {:50} {}<br>".format(str(counter), score[0], str(score[1]))
             counter += 1
 
-        self.high_scores_list = pygame_gui.elements.UITextBox(html_text=self.score_string, relative_rect=pygame.Rect((383,220), (600, 230)), manager=self.gui_manager)
+        if self.high_scores_list is not None:
+            self.high_scores_list.kill()
+        self.high_scores_list = pygame_gui.elements.UITextBox(html_text=self.score_string, relative_rect=ui_rect((383, 220), (600, 230)), manager=self.gui_manager, container=self.container)
 
     def check_conditions(self):
-        self.time_delta = GameApp.game_clock.tick(60)/1000.0
-        for event in pygame.event.get():
+        for event in self.get_events():
             self.gui_manager.process_events(event)
             if event.type == KEYDOWN:
                 if event.key == K_ESCAPE:
@@ -311,8 +504,10 @@ class HighScoresMenu(GameState):
         self.build_scores_table()
 
 class AboutMenu(GameState):
+    idle = True
+
     def initialize_gui_elements(self):
-        self.title_label = pygame_gui.elements.ui_label.UILabel(relative_rect=pygame.Rect((383, 160), (600, 40)), text="ABOUT STARSHIP ODYSSEY", manager=self.gui_manager)
+        self.title_label = pygame_gui.elements.ui_label.UILabel(relative_rect=ui_rect((383, 160), (600, 40)), text="ABOUT STARSHIP ODYSSEY", manager=self.gui_manager, container=self.container)
         about_file = open(ABOUT_FILE, "r", 1)
         string = ""
         for line in about_file:
@@ -321,11 +516,11 @@ class AboutMenu(GameState):
         string = string.rstrip(string[-1])
         about_file.close()
             
-        self.about_text = pygame_gui.elements.ui_text_box.UITextBox(relative_rect=pygame.Rect((383, 210), (600, 300)), manager=self.gui_manager, html_text=string)
-        self.back_btn = pygame_gui.elements.ui_button.UIButton(relative_rect=pygame.Rect((383, 550), (175, 40)), text="BACK", manager=self.gui_manager)
+        self.about_text = pygame_gui.elements.ui_text_box.UITextBox(relative_rect=ui_rect((383, 210), (600, 300)), manager=self.gui_manager, container=self.container, html_text=string)
+        self.back_btn = pygame_gui.elements.ui_button.UIButton(relative_rect=ui_rect((383, 550), (175, 40)), text="BACK", manager=self.gui_manager, container=self.container)
 
     def check_conditions(self):
-        for event in pygame.event.get():
+        for event in self.get_events():
             self.gui_manager.process_events(event)
             if event.type == KEYDOWN:
                 if event.key == K_ESCAPE:
@@ -336,50 +531,82 @@ class AboutMenu(GameState):
                         return "main_menu"
 
 class GamePlayMenu(GameState):
+    target_fps = GAMEPLAY_FPS
+
     def __init__(self, name):
+        self.input_source = KeyboardInput()
+        self.recorder = None
+        self.renderer = DirtyRectRenderer(BLACK)
         super().__init__(name)
         self.reset_game()
-        self.number_font = pygame.font.Font("freesansbold.ttf", 96)
+        self.countdown_atlas = GlyphAtlas(load_font(NUMBER_FONT_FILE, GameApp.resolution.length(COUNTDOWN_FONT_SIZE)), WHITE, COUNTDOWN_TEXT)
 
     def initialize_gui_elements(self):
-        pygame_gui.elements.ui_label.UILabel(relative_rect=pygame.Rect((20, 20), (150, 40)), text="PLAYER:", manager=self.gui_manager)
-        self.name_pane = pygame_gui.elements.ui_label.UILabel(relative_rect=pygame.Rect((20, 70), (150, 40)), text=GameApp.current_player.name , manager=self.gui_manager)
-        pygame_gui.elements.ui_label.UILabel(relative_rect=pygame.Rect((20, 120), (150, 40)), text="PERSONAL BEST:", manager=self.gui_manager)
-        self.pb_pane = pygame_gui.elements.ui_label.UILabel(relative_rect=pygame.Rect((20, 180), (150, 40)), text=str(GameApp.current_player.personal_best), manager=self.gui_manager)
-        self.score_pane = pygame_gui.elements.ui_label.UILabel(relative_rect=pygame.Rect((608, 20), (150, 40)), text="SCORE: " + str(GameApp.current_score), manager=self.gui_manager)
-
-    def reset_game(self):
+        #In-game text is drawn by the HUD from pre-rendered glyphs rather than by pygame_gui
+        self.hud = HUD(GlyphAtlas(load_font(NUMBER_FONT_FILE, GameApp.resolution.length(HUD_FONT_SIZE)), WHITE))
+        self.hud.add("player_label", ui_rect((20, 20), (150, 40)), value="PLAYER:")
+        self.hud.add("player", ui_rect((20, 70), (150, 40)), value=GameApp.current_player.name)
+        self.hud.add("best_label", ui_rect((20, 120), (150, 40)), value="PERSONAL BEST:")
+        self.hud.add("best", ui_rect((20, 180), (150, 40)), value=GameApp.current_player.personal_best or 0)
+        self.hud.add("score", ui_rect((608, 20), (150, 40)), "SCORE: ", GameApp.current_score)
+        if GameApp.profiler.enabled:
+            self.hud.add("fps", ui_rect((1196, 20), (150, 40)), "FPS: ", 0)
+
+    def reset_game(self, seed=None, meteor_count=METEOR_COUNT, meteor_speed_range=METEOR_SPEED_RANGE, spacecraft_speed=SPACECRAFT_SPEED, waves=None):
+        self.finish_recording(False)
         GameApp.current_score = 0
-        self.game_objects = []
-        starship = Starship(self, (SCREEN_SIZE[0]/2.0), (SCREEN_SIZE[1]-100))
-        self.starship = starship
-        self.game_objects.append(starship)
-
-        for _ in range(10):
-            meteor_speed = randint(800, 1000) * 1.0
-            x_location = randint(0, SCREEN_SIZE[0])
-            meteor = Meteor(self, x_location, -20, meteor_speed)
-            self.game_objects.append(meteor)
+        #An explicit seed is always drawn so that any game can be recorded and replayed
+        if seed is None:
+            seed = int(np.random.SeedSequence().generate_state(1, np.uint64)[0] >> 1)
+        self.seed = seed
+        self.rng = np.random.default_rng(seed)
+        #Frame time not yet simulated, always less than one SIMULATION_TIMESTEP
+        self.accumulator = 0.0
+        self.starship = Starship(self, (SCREEN_SIZE[0]/2.0), (SCREEN_SIZE[1]-100), spacecraft_speed)
+        meteor_image = image_cache.get("images/meteor.png")
+        meteor_mask = image_cache.mask("images/meteor.png", COLLISION_MASK_RESOLUTION)
+        capacity = waves_capacity(waves) if waves else None
+        self.meteor_field = MeteorField(meteor_image, meteor_count, SCREEN_SIZE, meteor_speed_range, self.rng, capacity,
+                                        meteor_mask, COLLISION_MASK_RESOLUTION)
+        self.broadphase = ArrayScan()
+        #The game is simulated in logical units and only drawn at the render resolution
+        resolution = GameApp.resolution
+        if resolution.scale != 1.0:
+            self.starship.set_render_scale(resolution.scale, resolution.image("images/space_craft.png"))
+            self.meteor_field.set_render_scale(resolution.scale, resolution.image("images/meteor.png"))
+        self.meteor_count = meteor_count
+        self.meteor_speed_range = meteor_speed_range
+        self.spacecraft_speed = spacecraft_speed
+        self.waves = WaveScheduler(self.meteor_field, waves) if waves else None
 
-        self.clock = pygame.time.Clock()
 
     def do_actions(self):
         #super().do_actions()
-        #Draw all game artifacts here
-        GameApp.screen.fill(BLACK)
-        for asset in self.game_objects:
-            asset.render(GameApp.screen)
-
-        self.display_score()
-        #self.display_player_stats()
-        self.gui_manager.update(self.time_delta)
-        self.gui_manager.draw_ui(GameApp.screen)
-        pygame.display.update()
-
-        pygame.display.update()
+        #Draw all game artifacts here, erasing and pushing only what moved since the last frame
+        self.frame_start = time.perf_counter()
+        profiler = GameApp.profiler
+        with profiler.phase(self.name, "render"):
+            self.renderer.erase(GameApp.screen)
+            self.hud.erase(GameApp.screen, self.renderer.erased_rects, self.renderer.background)
+            #Movers are drawn between their last two simulated positions, by how far the
+            #frame clock has run into the next step
+            alpha = self.accumulator / SIMULATION_TIMESTEP
+            self.renderer.add_drawn(self.meteor_field.render(GameApp.screen, alpha))
+            self.renderer.add_drawn([self.starship.render(GameApp.screen, alpha)])
+
+        with profiler.phase(self.name, "hud"):
+            self.display_score()
+            #self.display_player_stats()
+            for rect in self.hud.draw(GameApp.screen, self.renderer.drawn_rects):
+                self.renderer.add_dirty(rect)
+
+        with profiler.phase(self.name, "display_flip"):
+            self.renderer.present(GameApp.screen)
 
     def display_score(self):
-        self.score_pane.set_text("SCORE: " + str(GameApp.current_score))
+        self.hud.set("score", GameApp.current_score)
+        if "fps" in self.hud.items and self.time_delta:
+            self.hud.set("fps", round(1.0 / self.time_delta))
         #score_font = pygame.font.SysFont("inconsolata", 32, bold=True)
         #score_surface = score_font.render("SCORE:" + str(GameApp.current_score), True, WHITE, BLACK)
         #GameApp.screen.blit(score_surface, (0, 0))
@@ -390,82 +617,120 @@ class GamePlayMenu(GameState):
         GameApp.screen.blit(player_surface, (0, 40))
 
     def check_conditions(self):
-        for event in pygame.event.get():
+        for event in self.get_events():
             if event.type == KEYDOWN:
                 if event.key == K_ESCAPE:
                     GameApp.game_state = "paused"
                     return "pause_screen"
 
-        time_passed = self.clock.tick()/1000.0
-        return self.update(time_passed)
+        new_state_name = self.advance(self.time_delta)
+        if GameApp.governor is not None:
+            GameApp.governor.record(time.perf_counter() - self.frame_start)
+        return new_state_name
+
+    def advance(self, time_delta):
+        """Run as many fixed steps as the frame's time covers, carrying the rest over to the next frame"""
+        self.accumulator = min(self.accumulator + time_delta, MAX_FRAME_TIME)
+        while self.accumulator >= SIMULATION_TIMESTEP:
+            self.accumulator -= SIMULATION_TIMESTEP
+            new_state_name = self.update(SIMULATION_TIMESTEP)
+            if new_state_name is not None:
+                return new_state_name
+        return None
+
+    def start_recording(self, path):
+        #A replay can only name the default waves, so a game with any others could not be played back
+        if self.waves is not None and self.waves.waves != DEFAULT_WAVES:
+            raise ValueError("only games with the default waves can be recorded")
+        self.recorder = ReplayRecorder(path, self.seed, self.meteor_count, self.meteor_speed_range, self.spacecraft_speed,
+                                       self.waves is not None, self.input_source)
+        self.input_source = self.recorder
+
+    def finish_recording(self, crashed):
+        if self.recorder is not None:
+            self.recorder.close(GameApp.current_score, crashed)
+            self.input_source = self.recorder.source
+            self.recorder = None
+
+    def discard(self):
+        self.finish_recording(False)
+        super().discard()
 
     def update(self, time_passed):
-        for asset in self.game_objects:
-            asset.update(time_passed)
-            if asset.type == "meteor":
-                if self.starship.rect.colliderect(asset.rect):
-                    ##if self.player.high_score < self.score:
-                        ##self.player.high_score = self.score
-                    GameApp.game_state = "not_running"
-                    return "game_result"
+        if self.recorder is not None:
+            time_passed = self.recorder.record_time(time_passed)
+
+        profiler = GameApp.profiler
+        with profiler.phase(self.name, "update"):
+            if self.waves is not None:
+                self.waves.update(time_passed)
+            self.starship.update(time_passed)
+            GameApp.current_score += self.meteor_field.update(time_passed)
+
+        with profiler.phase(self.name, "collision"):
+            #The broadphase finds the meteors whose hitboxes met the box swept by the ship;
+            #only those are compared with its sprite pixel by pixel
+            starship = self.starship
+            self.broadphase.update_array("meteors", self.meteor_field.hitboxes)
+            candidates = [index for _, index in self.broadphase.query(starship.rect.union(starship.previous_rect))]
+            collided = self.meteor_field.collides_with(starship.rect, starship.mask, starship.previous_rect, candidates)
+
+        if collided:
+            GameApp.game_state = "not_running"
+            self.finish_recording(True)
+            return "game_result"
         return None
 
     def entry_actions(self):
-        self.name_pane.set_text(GameApp.current_player.name)
-        self.pb_pane.set_text(str(GameApp.current_player.personal_best))
+        self.hud.set("player", GameApp.current_player.name)
+        self.hud.set("best", GameApp.current_player.personal_best or 0)
         pygame.mouse.set_visible(False)
+        self.renderer.invalidate()
         
         if GameApp.game_state == "not_running":
-            self.reset_game()
+            self.reset_game(waves=GameApp.waves)
+            if GameApp.record_dir:
+                self.start_recording(new_replay_path(GameApp.record_dir))
             GameApp.game_state = "running"
             self.count_down()
             #Start clock
         elif GameApp.game_state == "paused":
-            #Reset clocking
             self.count_down()
-            self.clock.tick()
+            self.accumulator = 0.0
 
         pygame.event.clear()
 
     def count_down(self):
         #Show countdown timer to allow player to start game comfortably 
-        count = 3
-        while count:
+        for text in COUNTDOWN_TEXT:
             self.do_actions()
-            number_surface = self.number_font.render(str(count), True, pygame.Color("#FFFFFF"))
+            number_surface = self.countdown_atlas.get(text)
             number_rectangle = number_surface.get_rect()
-            number_rectangle.center = ((1366/2),(768/2))
-            GameApp.screen.blit(number_surface, number_rectangle)
-            pygame.display.update()
-            time.sleep(1)
-            count -= 1
-
-        self.do_actions()
-        number_surface = self.number_font.render("GO!", True, pygame.Color("#FFFFFF"))
-        number_rectangle = number_surface.get_rect()
-        number_rectangle.center = ((1366/2),(768/2))
-        GameApp.screen.blit(number_surface, number_rectangle)
-        pygame.display.update()
-        time.sleep(0.5)
+            number_rectangle.center = GameApp.screen.get_rect().center
+            self.renderer.add_drawn([GameApp.screen.blit(number_surface, number_rectangle)])
+            self.renderer.present(GameApp.screen)
+            time.sleep(0.5 if text == "GO!" else 1)
 
     def exit_actions(self):
         pygame.mouse.set_visible(True)
-        GameApp.old_screen = GameApp.screen.copy()
+        GameApp.overlay.capture(GameApp.screen)
         
 class GameResultMenu(GameState):
+    idle = True
+
     def __init__(self, name):
         super().__init__(name)
         
     def initialize_gui_elements(self):
-        self.menu_title = pygame_gui.elements.ui_label.UILabel(relative_rect=pygame.Rect((383, 160), (600, 40)), manager=self.gui_manager, text="GAME OVER")
-        self.score_label = pygame_gui.elements.ui_label.UILabel(relative_rect=pygame.Rect((383, 250), (600, 40)), manager=self.gui_manager, text="Your score:")
-        self.continue_btn = pygame_gui.elements.ui_button.UIButton(relative_rect=pygame.Rect((808, 350), (175, 40)), text="Continue", manager=self.gui_manager)
+        self.menu_title = pygame_gui.elements.ui_label.UILabel(relative_rect=ui_rect((383, 160), (600, 40)), manager=self.gui_manager, container=self.container, text="GAME OVER")
+        self.score_label = pygame_gui.elements.ui_label.UILabel(relative_rect=ui_rect((383, 250), (600, 40)), manager=self.gui_manager, container=self.container, text="Your score:")
+        self.continue_btn = pygame_gui.elements.ui_button.UIButton(relative_rect=ui_rect((808, 350), (175, 40)), text="Continue", manager=self.gui_manager, container=self.container)
 
     def do_actions(self):
         super().do_actions(False)
        
     def check_conditions(self):
-        for event in pygame.event.get():
+        for event in self.get_events():
             self.gui_manager.process_events(event)
             if event.type == KEYDOWN:
                 if event.key == K_RETURN:
@@ -476,46 +741,44 @@ class GameResultMenu(GameState):
                         return "main_menu"
 
     def entry_actions(self):
+        GameApp.overlay.compose()
         self.score_label.set_text("Your score: " + str(GameApp.current_score))
-        new_score = Score(score=GameApp.current_score, player_id=GameApp.current_player.id)
-        GameApp.session.add(new_score)
-        GameApp.session.commit()
+        #The score is written on the persistence thread so the game-over screen does not wait on the disk
+        GameApp.score_writer.submit(GameApp.current_player.id, GameApp.current_score, callback=log_failed_write)
         
         #Check if the game result is a high-score
-        if GameApp.current_score > (GameApp.high_score_list[len(GameApp.high_score_list)-1][1] if GameApp.high_score_list else 0):
+        is_high_score = GameApp.isHighScore()
+        GameApp.leaderboard.add(GameApp.current_player.name, GameApp.current_score)
+        if is_high_score:
             self.menu_title.set_text("CONGRATULATIONS: HIGH SCORE!")
         else:
             self.menu_title.set_text("GAME OVER!")
             
     def exit_actions(self):
-        GameApp.old_screen = None
+        GameApp.overlay.release()
         if GameApp.current_score > GameApp.current_player.personal_best:
-            #Adjust the current player's personal best
-            GameApp.current_player.personal_best = GameApp.current_score
-            GameApp.session.add(GameApp.current_player)
-
-            #Refresh Current Player
-            GameApp.current_player = GameApp.session.query(Player).get(GameApp.current_player.id)
-
-        #Refresh the High-Score List
-        GameApp.high_score_list = []
-        high_scores = GameApp.session.query(Score).order_by(Score.score.desc()).limit(10).all()
-
-        for score in high_scores:
-            GameApp.high_score_list.append((score.player.name, score.score))
+            #The score writer raises personal_best in the database along with the score,
+            #so only the loaded player is updated here, without marking it dirty
+            set_committed_value(GameApp.current_player, "personal_best", GameApp.current_score)
+        GameApp.review_render_scale()
 
 class PauseScreenMenu(GameState):
+    idle = True
+
     def initialize_gui_elements(self):
-        self.menu_title = pygame_gui.elements.ui_label.UILabel(relative_rect=pygame.Rect((383, 160), (600, 40)), text="GAME PAUSED", manager=self.gui_manager)
-        self.question_label = pygame_gui.elements.ui_label.UILabel(relative_rect=pygame.Rect((383, 250), (600, 40)), text="What do you want to do?", manager=self.gui_manager)
-        self.quit_btn = pygame_gui.elements.ui_button.UIButton(relative_rect=pygame.Rect((480, 350), (175, 40)), text="Resign", manager=self.gui_manager)
-        self.resume_btn = pygame_gui.elements.ui_button.UIButton(relative_rect=pygame.Rect((700, 350), (175, 40)), text="Resume Game", manager=self.gui_manager)
+        self.menu_title = pygame_gui.elements.ui_label.UILabel(relative_rect=ui_rect((383, 160), (600, 40)), text="GAME PAUSED", manager=self.gui_manager, container=self.container)
+        self.question_label = pygame_gui.elements.ui_label.UILabel(relative_rect=ui_rect((383, 250), (600, 40)), text="What do you want to do?", manager=self.gui_manager, container=self.container)
+        self.quit_btn = pygame_gui.elements.ui_button.UIButton(relative_rect=ui_rect((480, 350), (175, 40)), text="Resign", manager=self.gui_manager, container=self.container)
+        self.resume_btn = pygame_gui.elements.ui_button.UIButton(relative_rect=ui_rect((700, 350), (175, 40)), text="Resume Game", manager=self.gui_manager, container=self.container)
 
     def do_actions(self):
         super().do_actions(False)
         
+    def entry_actions(self):
+        GameApp.overlay.compose()
+
     def check_conditions(self):
-        for event in pygame.event.get():
+        for event in self.get_events():
             self.gui_manager.process_events(event)
             if event.type == KEYDOWN:
                 if event.key == K_ESCAPE or event.key == K_r:
@@ -532,37 +795,62 @@ class PauseScreenMenu(GameState):
                         return "main_menu"
         return None
 
+    def exit_actions(self):
+        if GameApp.game_state == "not_running":
+            #The game was resigned, so its replay ends here
+            GameApp.menu_system.get_state("game_play").finish_recording(False)
+            GameApp.review_render_scale()
+
 class GameAsset(object):
     def __init__(self, world, x_location = 0.0, y_location = 0.0):
         self.world = world
         self.location = Vector2(x_location, y_location)
+        self.previous = Vector2(x_location, y_location)
+
+    def render(self, surface, alpha=1.0):
+        #Drawn alpha of the way from where the last update started to where it ended
+        x = self.previous.x + (self.location.x - self.previous.x) * alpha
+        y = self.previous.y + (self.location.y - self.previous.y) * alpha
+        scale = self.render_scale
+        return surface.blit(self.render_image, (x * scale - self.render_w/2, y * scale - self.render_h/2))
 
-    def render(self, surface):
-        surface.blit(self.image, (self.location.x - self.image_w/2, self.location.y - self.image_h/2))
+    def set_render_scale(self, scale, image):
+        """Draw scale times the size, with image (a CachedImage) scaled to match"""
+        self.render_scale = scale
+        self.render_image = image.surface
+        self.render_w, self.render_h = image.width, image.height
 
     def update(self, time_passed):
+        self.previous.set(self.location.x, self.location.y)
+        self.previous_rect.topleft = self.rect.topleft
         self.heading.normalize()
-        self.location +=  self.heading * self.speed * time_passed
-        self.rect.center = (self.location.x, self.location.y)
-        #self.rect.center = ((self.location.x + self.image_w/2), (self.location.y + self.image_h/2))
-        #self.rect = self.image.get_rect(center=(self.location.x, self.location.y))
+        self.location.add_scaled(self.heading, self.speed * time_passed)
+        self.place_rect()
+
+    def place_rect(self):
+        #The rect covers exactly the pixels render() draws to, which the collision mask is aligned with
+        self.rect.topleft = (int(self.location.x - self.image_w/2), int(self.location.y - self.image_h/2))
 
     def load_image(self, filename):
-        self.image = pygame.image.load(filename).convert_alpha()
-        self.image_w, self.image_h = self.image.get_size()
-        self.rect = pygame.Rect((self.location.x-(self.image_w/2)), (self.location.y-(self.image_h/2)), self.image_w*0.70, self.image_h*0.40)
-        #self.rect = self.image.get_rect(center=(self.location.x, self.location.y))
+        cached_image = image_cache.get(filename)
+        self.image = cached_image.surface
+        self.image_w, self.image_h = cached_image.width, cached_image.height
+        self.mask = image_cache.mask(filename, COLLISION_MASK_RESOLUTION)
+        self.rect = pygame.Rect(0, 0, self.image_w, self.image_h)
+        self.place_rect()
+        self.previous_rect = self.rect.copy()
+        self.set_render_scale(1.0, cached_image)
 
 class Starship(GameAsset):
-    def __init__(self, world, x_location, y_location):
+    def __init__(self, world, x_location, y_location, speed=SPACECRAFT_SPEED):
         super().__init__(world, x_location, y_location)
         self.heading = Vector2(0.0, 0.0)
         self.load_image("images/space_craft.png")
-        self.speed = SPACECRAFT_SPEED 
+        self.speed = speed
         self.type = "spaceship"
 
     def update(self, time_passed):
-        pressed_keys = pygame.key.get_pressed()
+        pressed_keys = self.world.input_source.get_pressed()
 
         if pressed_keys[K_LEFT]:
             self.heading.x = -1.0
@@ -589,87 +877,210 @@ class Starship(GameAsset):
             self.location.y = SCREEN_SIZE[1] - self.image_h
         elif self.location.y < self.image_h:
             self.location.y = self.image_h
-
-class Meteor(GameAsset):
-    def __init__(self, world, x_location=0.0, y_location=0.0, speed=100.0):
-        super().__init__(world, x_location, y_location)
-        self.heading = Vector2(0.0, 1.0)
-        self.load_image("images/meteor.png")
-        self.speed = speed
-        self.type = "meteor"
-
-    def update(self, time_passed):
-        super().update(time_passed)
-
-        if self.location.y >= SCREEN_SIZE[1]:
-            self.location.x = randint(0, SCREEN_SIZE[0])
-            self.location.y = 0
-            GameApp.current_score += 1
+        self.place_rect()
 
 class GameApp():
     current_score = None 
     screen = None 
-    player_list = None 
+    resolution = RenderResolution()
+    #Steps the render scale between games when it is chosen automatically, otherwise None
+    governor = None
+    headless = False
+    vsync = False
+    overlay = OverlayCompositor(SCREEN_SIZE)
+    player_directory = None
     current_player = None 
     high_score_list = []
+    leaderboard = Leaderboard(10)
     menu_system = None
     game_state = "not_running"
-    game_clock = None
+    scheduler = None
     gui_manager = None
     session = None
     player_buff = None
+    score_writer = None
+    profiler = FrameProfiler()
+    #Games are recorded as replays into this directory when it is set
+    record_dir = None
+    #Waves that ramp up the meteors during a game, or None for a fixed count
+    waves = None
+    #Scores older than this many days are moved to ARCHIVE_DIRECTORY at startup when it is set
+    archive_days = None
 
     @classmethod
-    def initialize(cls):
+    def initialize(cls, headless=False, vsync=False, power_save=False, render_scale=1.0, database_url=DEFAULT_DATABASE_URL):
+        """render_scale is one of RENDER_SCALES, or "auto" to start at full size and step down
+        between games whenever gameplay frames run over budget"""
+        if headless:
+            os.environ["SDL_VIDEODRIVER"] = "dummy"
+        init_db(database_url)
         cls.session = Session()
+        cls.score_writer = ScoreWriter()
         cls.current_score = 0
         pygame.init()
-        cls.screen = pygame.display.set_mode(SCREEN_SIZE, FULLSCREEN, 32)
-        cls.gui_manager = pygame_gui.UIManager(SCREEN_SIZE)
-        cls.game_clock = pygame.time.Clock()
-        cls.player_list = cls.get_player_list()
+        cls.headless = headless
+        cls.vsync = vsync
+        if render_scale == "auto":
+            cls.governor = ResolutionGovernor(1.0 / GAMEPLAY_FPS)
+            render_scale = RENDER_SCALES[0]
+        cls.resolution = RenderResolution(render_scale)
+        vsync_rate = cls.open_display()
+        cls.overlay = OverlayCompositor(cls.resolution.size)
+        cls.gui_manager = pygame_gui.UIManager(cls.resolution.size, cls.resolution.gui_theme())
+        cls.scheduler = FrameScheduler(MENU_FPS, power_save, vsync_rate)
+        cls.player_directory = PlayerDirectory(cls.session)
         cls.current_player = Player(name="default_player")
-        cls.menu_system = MenuStateMachine()
-        cls.refresh_high_scores()
+        cls.menu_system = MenuStateMachine(cls.profiler, cls.scheduler)
         cls.create_menus()
 
+    @classmethod
+    def open_display(cls):
+        """Open the display at the render resolution and return its refresh rate if presentation is vsynced.
+        SCALED leaves stretching each frame to the screen to SDL, on the GPU where there is one."""
+        size = cls.resolution.size
+        if cls.headless:
+            cls.screen = pygame.display.set_mode(size)
+            return None
+        if cls.vsync:
+            #SDL only honours vsync for scaled or OpenGL displays
+            try:
+                cls.screen = pygame.display.set_mode(size, FULLSCREEN | SCALED, 32, vsync=1)
+                return pygame.display.get_current_refresh_rate() or 60
+            except pygame.error:
+                pass
+        cls.screen = pygame.display.set_mode(size, FULLSCREEN | SCALED, 32)
+        return None
+
+    @classmethod
+    def set_render_scale(cls, scale):
+        """Draw everything at a new render scale from now on; menus are rebuilt for it as they are entered"""
+        cls.resolution = RenderResolution(scale)
+        cls.open_display()
+        cls.overlay = OverlayCompositor(cls.resolution.size)
+        cls.gui_manager = pygame_gui.UIManager(cls.resolution.size, cls.resolution.gui_theme())
+        cls.gui_manager.preload_fonts(cls.gui_fonts())
+        cls.menu_system.discard_states()
+
+    @classmethod
+    def review_render_scale(cls):
+        #Only called between games, when nothing on screen needs to survive the switch
+        if cls.governor is not None:
+            scale = cls.governor.next_scale(cls.resolution.scale)
+            if scale != cls.resolution.scale:
+                cls.set_render_scale(scale)
+
+    @classmethod
+    def gui_fonts(cls):
+        return [dict(font, point_size=cls.resolution.length(font["point_size"])) for font in GUI_FONTS]
+
+    @classmethod
+    def preload(cls):
+        """Warm everything the first menus and game need; runs on a thread behind the splash screen"""
+        if cls.archive_days is not None:
+            #A failed archive leaves the scores in the database, so the game can go on without it
+            try:
+                archive_scores(get_engine(), ARCHIVE_DIRECTORY, cls.archive_days)
+            except Exception:
+                logging.exception("Archiving scores older than %d days failed", cls.archive_days)
+        cls.refresh_high_scores()
+        cls.player_directory.page()
+        for filename in GAME_IMAGE_FILES:
+            cls.resolution.image(filename)
+            image_cache.mask(filename, COLLISION_MASK_RESOLUTION)
+        load_font(NUMBER_FONT_FILE, cls.resolution.length(COUNTDOWN_FONT_SIZE))
+        cls.gui_manager.preload_fonts(cls.gui_fonts())
+
     @classmethod
     def run(cls):
+        cls.menu_system.set_state("splash_screen")
         cls.menu_system.process()
 
     @classmethod
-    def create_menus(cls):
-        cls.menu_system.add_state(AboutMenu("about"))
-        cls.menu_system.add_state(CreatePlayerMenu("create_player"))
-        cls.menu_system.add_state(GamePlayMenu("game_play"))
-        cls.menu_system.add_state(GameResultMenu("game_result"))
-        cls.menu_system.add_state(HighScoresMenu("high_scores"))
-        cls.menu_system.add_state(MainMenu("main_menu"))
-        cls.menu_system.add_state(PauseScreenMenu("pause_screen"))
-        cls.menu_system.add_state(SelectPlayerMenu("select_player"))
-        cls.menu_system.add_state(SplashScreenMenu("splash_screen"))
-        cls.menu_system.set_state("splash_screen")
+    def shutdown(cls):
+        game = cls.menu_system.states.get("game_play") if cls.menu_system else None
+        if game is not None:
+            game.finish_recording(False)
+        if cls.score_writer is not None:
+            cls.score_writer.close()
+        Session.remove()
+        cls.profiler.disable()
 
     @classmethod
-    def isHighScore(cls):
-        if GameApp.current_score > GameApp.high_score_list[9][1]:
-            return True
-        else:
-            return False
+    def quit(cls):
+        cls.shutdown()
+        pygame.quit()
+        exit()
 
     @classmethod
-    def dep_isHighScore(cls):
-        if len(cls.high_score_list) < 10:
-            return True
-
-        if len(cls.high_score_list) > 0:
-            lowest_high = cls.high_score_list[len(cls.high_score_list) - 1][1]
-            if cls.current_score > lowest_high:
-                return True
-            else:
-                return False 
-        else:
-            return True
+    def simulate(cls, seed, input_source=None, timestep=SIMULATION_TIMESTEP, max_time=SIMULATION_MAX_TIME, record_path=None, **settings):
+        """Play one game without rendering on a fixed timestep and return its SimulationResult.
+        The same seed, input script and settings (reset_game's keyword arguments) always
+        produce the same result."""
+        game = cls.menu_system.get_state("game_play")
+        game.input_source = input_source if input_source is not None else ScriptedInput()
+        game.reset_game(seed, **settings)
+        if record_path:
+            game.start_recording(record_path)
+        frames = 0
+        crashed = False
+        while frames * timestep < max_time:
+            frames += 1
+            if game.update(timestep) is not None:
+                crashed = True
+                break
+
+        game.finish_recording(crashed)
+        cls.game_state = "not_running"
+        return SimulationResult(seed, cls.current_score, frames, frames * timestep, crashed)
+
+    @classmethod
+    def replay(cls, path, render=False, realtime=False):
+        """Play a recorded game back, as fast as possible unless realtime, and return its SimulationResult"""
+        player = ReplayPlayer(path)
+        game = cls.menu_system.get_state("game_play")
+        game.reset_game(player.seed, player.meteor_count, player.meteor_speed_range, player.spacecraft_speed,
+                        waves=DEFAULT_WAVES if player.waves else None)
+        game.input_source = player
+        if render:
+            game.renderer.invalidate()
+
+        start = time.perf_counter()
+        sim_time = 0.0
+        frames = 0
+        crashed = False
+        for time_passed in player.time_steps():
+            frames += 1
+            sim_time += time_passed
+            if game.update(time_passed) is not None:
+                crashed = True
+                break
+            if render:
+                pygame.event.pump()
+                game.time_delta = time_passed
+                game.do_actions()
+            if realtime:
+                cls.scheduler.wait_until(start + sim_time)
+
+        game.input_source = KeyboardInput()
+        cls.game_state = "not_running"
+        return SimulationResult(player.seed, cls.current_score, frames, sim_time, crashed)
+
+    @classmethod
+    def create_menus(cls):
+        #States are only built when first entered
+        cls.menu_system.register("about", AboutMenu)
+        cls.menu_system.register("create_player", CreatePlayerMenu)
+        cls.menu_system.register("game_play", GamePlayMenu)
+        cls.menu_system.register("game_result", GameResultMenu)
+        cls.menu_system.register("high_scores", HighScoresMenu)
+        cls.menu_system.register("main_menu", MainMenu)
+        cls.menu_system.register("pause_screen", PauseScreenMenu)
+        cls.menu_system.register("select_player", SelectPlayerMenu)
+        cls.menu_system.register("splash_screen", SplashScreenMenu)
+
+    @classmethod
+    def isHighScore(cls):
+        return cls.leaderboard.is_high_score(cls.current_score)
 
     @classmethod
     def add_new_player(cls, player_name):
@@ -679,25 +1090,69 @@ class GameApp():
     @classmethod
     def delete_player(cls, player_name):
         player = cls.session.query(Player).filter_by(name=player_name).first()
-        cls.session.delete(player)
+        delete_player(cls.session, player)
 
     @classmethod
     def get_player_list(cls):
-        player_list = []
-        players = cls.session.query(Player).all()
-        for player in players:
-            player_list.append((player.name, player.personal_best)) 
-
-        return player_list
+        #Every player as (name, personal_best); menus page through player_directory instead
+        return cls.session.query(Player.name, Player.personal_best).order_by(Player.name).all()
 
     @classmethod
     def refresh_high_scores(cls):
-        cls.high_score_list = []
-        scores = cls.session.query(Score).order_by(Score.score.desc()).limit(10).all()
-
-        for score in scores:
-            cls.high_score_list.append((score.player.name, score.score))
+        #high_score_list is the leaderboard's own list, which it keeps sorted as scores arrive
+        cls.leaderboard.load(cls.session)
+        cls.high_score_list = cls.leaderboard.top
 
 if __name__ == "__main__":
-    GameApp.initialize()
-    GameApp.run()
+    parser = argparse.ArgumentParser(description="Starship")
+    parser.add_argument("--headless", action="store_true", help="simulate games without a display instead of playing")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the first simulated game")
+    parser.add_argument("--games", type=int, default=1, help="number of games to simulate")
+    parser.add_argument("--record", metavar="DIR", help="record every game played or simulated as a replay in DIR")
+    parser.add_argument("--replay", metavar="FILE", help="play back a recorded game and check it ends the same way")
+    parser.add_argument("--render", action="store_true", help="draw the replay on screen instead of only simulating it")
+    parser.add_argument("--realtime", action="store_true", help="play the replay back at the speed it was recorded")
+    parser.add_argument("--waves", action="store_true", help="ramp up the number and speed of meteors as the game goes on")
+    parser.add_argument("--vsync", action="store_true", help="present frames in step with the display refresh")
+    parser.add_argument("--database", default=DEFAULT_DATABASE_URL, help="SQLAlchemy URL of the database; sqlite:// keeps it in memory")
+    parser.add_argument("--archive-days", type=int, help="at startup, move scores older than this many days out of the database into " + ARCHIVE_DIRECTORY)
+    parser.add_argument("--power-save", action="store_true", help="cap frame rates lower and never busy-wait, for laptops")
+    parser.add_argument("--render-scale", default=str(RENDER_SCALES[0]), choices=[str(scale) for scale in RENDER_SCALES] + ["auto"],
+                        help="draw frames at this fraction of 1366x768 and let the display scale them up, or pick it automatically from frame times")
+    parser.add_argument("--profile", action="store_true", help="time each state's frame phases; press F3 in game for an overlay")
+    parser.add_argument("--profile-output", help="periodically write the frame timings to this .csv or .jsonl file")
+    args = parser.parse_args()
+
+    if args.profile or args.profile_output:
+        GameApp.profiler.enable(args.profile_output)
+
+    if args.waves:
+        GameApp.waves = DEFAULT_WAVES
+    GameApp.archive_days = args.archive_days
+    if args.record:
+        os.makedirs(args.record, exist_ok=True)
+        GameApp.record_dir = args.record
+
+    try:
+        if args.replay:
+            GameApp.initialize(headless=args.headless or not args.render, database_url=args.database)
+            recording = ReplayPlayer(args.replay)
+            result = GameApp.replay(args.replay, args.render, args.realtime)
+            matches = (result.score, result.crashed) == (recording.score, recording.crashed)
+            print("replay of seed {}: score {} after {:.2f}s ({} frames), recorded score {}{}".format(
+                result.seed, result.score, result.sim_time, result.frames, recording.score, "" if matches else " MISMATCH"))
+        elif args.headless:
+            GameApp.initialize(headless=True, database_url=args.database)
+            start = time.perf_counter()
+            for seed in range(args.seed, args.seed + args.games):
+                record_path = os.path.join(args.record, "seed-{}.replay".format(seed)) if args.record else None
+                result = GameApp.simulate(seed, record_path=record_path, waves=GameApp.waves)
+                print("seed {}: score {} after {:.2f}s ({} frames)".format(result.seed, result.score, result.sim_time, result.frames))
+            print("simulated {} games in {:.2f}s".format(args.games, time.perf_counter() - start))
+        else:
+            GameApp.initialize(vsync=args.vsync, power_save=args.power_save, render_scale=args.render_scale if args.render_scale == "auto" else float(args.render_scale),
+                               database_url=args.database)
+            GameApp.run()
+    finally:
+        #Writes the scores still queued and closes any replay even if the game crashed
+        GameApp.shutdown()
@@ -3,24 +3,45 @@ import math
 class Vector2:
     """A 2-Dimensional Vector Class for 2-D Games"""
 
-    def __init__(self, x = 0.0, y = 0.0):
-        self.x = x
-        self.y = y
+    __slots__ = ("x", "y")
 
+    def __init__(self, x = 0.0, y = 0.0):
         if hasattr(x, "__getitem__"):
-            self.x, self.y = x
-            self._v = [float(self.x), float(self.y)]
-        else:
-            self._v = [float(self.x), float(self.y)]
+            x, y = x
+        self.x = float(x)
+        self.y = float(y)
 
     def __getitem__(self, index):
-        return self._v[index]
+        return (self.x, self.y)[index]
 
     def __setitem__(self, index, value):
-        self._v[index] = 1.0 * value
+        if index == 0:
+            self.x = float(value)
+        elif index == 1:
+            self.y = float(value)
+        else:
+            raise IndexError("Vector2 index out of range")
+
+    def __len__(self):
+        return 2
+
+    def __iter__(self):
+        yield self.x
+        yield self.y
+
+    def __eq__(self, other):
+        try:
+            return self.x == other[0] and self.y == other[1]
+        except (TypeError, IndexError):
+            return NotImplemented
+
+    __hash__ = None
 
     def __str__(self):
-        return "(" + str(self.x) + ", " + str(self.y) + ")" 
+        return "(" + str(self.x) + ", " + str(self.y) + ")"
+
+    def __repr__(self):
+        return "Vector2({}, {})".format(self.x, self.y)
 
     def __add__(self, other):
         return Vector2(self.x + other.x, self.y + other.y)
@@ -31,40 +52,77 @@ class Vector2:
     def __mul__(self, scalar):
         return Vector2(self.x * scalar, self.y * scalar)
 
+    __rmul__ = __mul__
+
     def __truediv__(self, scalar):
         return Vector2(self.x / scalar, self.y / scalar)
 
+    def __neg__(self):
+        return Vector2(-self.x, -self.y)
+
+    def __iadd__(self, other):
+        self.x += other.x
+        self.y += other.y
+        return self
+
+    def __isub__(self, other):
+        self.x -= other.x
+        self.y -= other.y
+        return self
+
+    def __imul__(self, scalar):
+        self.x *= scalar
+        self.y *= scalar
+        return self
+
+    def __itruediv__(self, scalar):
+        self.x /= scalar
+        self.y /= scalar
+        return self
+
+    def set(self, x, y):
+        self.x = x
+        self.y = y
+        return self
+
+    def add_scaled(self, other, scalar):
+        """In-place self += other * scalar without building a temporary vector"""
+        self.x += other.x * scalar
+        self.y += other.y * scalar
+        return self
+
+    def copy(self):
+        return Vector2(self.x, self.y)
+
     def magnitude(self):
-        return math.sqrt(self.x**2 + self.y**2)
+        return math.hypot(self.x, self.y)
 
     def dot(self, other):
-        pass
+        return self.x * other.x + self.y * other.y
 
     def cross(self, other):
-        pass
+        """Z component of the 3-D cross product of the two vectors"""
+        return self.x * other.y - self.y * other.x
 
+    @staticmethod
     def from_points(p1, p2):
         return Vector2(p2[0] - p1[0], p2[1] - p1[1])
 
     def normalize(self):
         mag = self.magnitude()
-        try:
+        if mag:
             self.x /= mag
             self.y /= mag
-        except ZeroDivisionError:
-            self.x = 0
-            self.y = 0
-        finally:
-            self._v[0] = self.x
-            self._v[1] = self.y
+        else:
+            self.x = 0.0
+            self.y = 0.0
+        return self
 
     def get_normalized(self):
-        normalized = self
-        normalized.normalize()
-        return norma
+        return self.copy().normalize()
 
     def get_distance_to(self, vect):
-        return magnitude(vect - self)
+        return math.hypot(vect[0] - self.x, vect[1] - self.y)
 
 if __name__ == "__main__":
     vec1 = Vector2(3, 4)
@@ -75,3 +133,7 @@ if __name__ == "__main__":
     print("vec1 - vec2: ", (vec1-vec2))
     print("vec1.magnitude():", vec1.magnitude())
     print("vec1.x", vec1.x)
+    print("vec1.dot(vec2):", vec1.dot(vec2))
+    print("vec1.cross(vec2):", vec1.cross(vec2))
+    print("vec1.get_distance_to(vec2):", vec1.get_distance_to(vec2))
+    print("vec1.get_normalized():", vec1.get_normalized(), "vec1:", vec1)
@@ -0,0 +1,54 @@
+from collections import namedtuple
+
+#Over duration seconds the field ramps linearly from the previous wave's meteor count
+#and speed scale to this wave's
+Wave = namedtuple("Wave", ["duration", "meteor_count", "speed_scale"])
+
+DEFAULT_WAVES = (
+    Wave(20.0, 10, 1.0),
+    Wave(30.0, 20, 1.1),
+    Wave(30.0, 35, 1.2),
+    Wave(60.0, 60, 1.35),
+    Wave(120.0, 100, 1.5),
+)
+
+#Ramps from a handful of meteors to thousands, for benchmarks.stress
+STRESS_WAVES = (
+    Wave(2.0, 10, 1.0),
+    Wave(10.0, 500, 1.0),
+    Wave(10.0, 2000, 1.0),
+    Wave(10.0, 5000, 1.0),
+)
+
+def waves_capacity(waves):
+    return max(wave.meteor_count for wave in waves)
+
+class WaveScheduler(object):
+    """Steers a MeteorField's target count and speed scale through a list of waves.
+
+    The field's arrays must already have room for the largest wave (see waves_capacity),
+    so ramping up only fills preallocated slots. After the last wave its values are held.
+    """
+
+    def __init__(self, field, waves):
+        self.field = field
+        self.waves = waves
+        self.elapsed = 0.0
+        self.wave_index = 0
+        self.wave_start = 0.0
+        self.apply()
+
+    def update(self, time_passed):
+        self.elapsed += time_passed
+        while self.wave_index < len(self.waves) - 1 and self.elapsed - self.wave_start >= self.waves[self.wave_index].duration:
+            self.wave_start += self.waves[self.wave_index].duration
+            self.wave_index += 1
+        self.apply()
+
+    def apply(self):
+        wave = self.waves[self.wave_index]
+        previous = self.waves[self.wave_index - 1] if self.wave_index else wave
+        progress = min(1.0, (self.elapsed - self.wave_start) / wave.duration) if wave.duration else 1.0
+        count = previous.meteor_count + (wave.meteor_count - previous.meteor_count) * progress
+        self.field.set_target(int(count))
+        self.field.speed_scale = previous.speed_scale + (wave.speed_scale - previous.speed_scale) * progress